@@ -10,10 +10,64 @@ item or None if item is not found.
     индекс mid+1, иначе ставим правую границу на mid (учитываем, что sorted_arr[mid] может
     быть равен item). Дожидаемся схождения левой и правой границ и сравниваем элемент на
     месте остановки правой границы (именно она отвечает за  местонахождение элемента x) с искомым.
+Variants: bisect_left and bisect_right (the first position where an item can be inserted before or
+after equal items), count_in_range and search_many, which finds a batch of items in one sweep.
+SortedFile and binary_search_file search a binary file of fixed-width records sorted by a numeric
+key without loading it: the file is memory-mapped, and each step of the search reads one key
+through a memoryview slice, so a lookup touches O(log n) pages.
 """
+from typing import Callable, Iterable, List, Optional
+from array import array
+import mmap
+import os
 
 
-def binary_search(sorted_arr: list, item):
+def bisect_left(sorted_arr, item, lo: int = 0, hi: Optional[int] = None,
+                key: Optional[Callable] = None) -> int:
+    """
+    Index of the first element of sorted_arr[lo:hi] not less than item. With key the elements are
+    compared by key(element), and item is a key value.
+
+    Examples:
+        >>> bisect_left([0, 2, 2, 3, 5], 2), bisect_left([0, 2, 2, 3, 5], 6), bisect_left([], 1)
+        (1, 5, 0)
+        >>> bisect_left(['a', 'bb', 'cc', 'ddd'], 2, key=len)
+        1
+    """
+    left, right = lo, len(sorted_arr) if hi is None else hi
+    while left < right:
+        mid = left + (right - left) // 2
+        value = sorted_arr[mid] if key is None else key(sorted_arr[mid])
+        if value < item:
+            left = mid + 1
+        else:
+            right = mid
+    return left
+
+
+def bisect_right(sorted_arr, item, lo: int = 0, hi: Optional[int] = None,
+                 key: Optional[Callable] = None) -> int:
+    """
+    Index of the first element of sorted_arr[lo:hi] greater than item.
+
+    Examples:
+        >>> bisect_right([0, 2, 2, 3, 5], 2), bisect_right([0, 2, 2, 3, 5], -1), bisect_right([], 1)
+        (3, 0, 0)
+        >>> bisect_right(['a', 'bb', 'cc', 'ddd'], 2, key=len)
+        3
+    """
+    left, right = lo, len(sorted_arr) if hi is None else hi
+    while left < right:
+        mid = left + (right - left) // 2
+        value = sorted_arr[mid] if key is None else key(sorted_arr[mid])
+        if item < value:
+            right = mid
+        else:
+            left = mid + 1
+    return left
+
+
+def binary_search(sorted_arr: list, item, key: Optional[Callable] = None) -> Optional[int]:
     """
     Examples:
         >>> binary_search([0, 2, 2, 3, 5], 2)
@@ -26,19 +80,157 @@ def binary_search(sorted_arr: list, item):
         1
         >>> binary_search([i for i in range(1000)], 5)
         5
+        >>> binary_search([], 5), binary_search([1, 3], 2), binary_search([1, 3], 4)
+        (None, None, None)
+        >>> binary_search(['a', 'bb', 'cc', 'ddd'], 3, key=len)
+        3
     """
-    left, right = 0, len(sorted_arr) - 1
-    while left < right:
-        mid = left + (right - left) // 2
-        if item > sorted_arr[mid]:
-            left = mid + 1
-        else:
-            right = mid
-    if sorted_arr[right] == item:
-        return right
+    right = bisect_left(sorted_arr, item, key=key)
+    if right < len(sorted_arr):
+        value = sorted_arr[right] if key is None else key(sorted_arr[right])
+        if value == item:
+            return right
     return None
 
 
+def count_in_range(sorted_arr, lo, hi, key: Optional[Callable] = None) -> int:
+    """
+    Number of elements x of sorted_arr with lo <= x <= hi (lo <= key(x) <= hi with key).
+
+    Examples:
+        >>> count_in_range([0, 2, 2, 3, 5], 2, 3), count_in_range([0, 2, 2, 3, 5], 6, 9)
+        (3, 0)
+        >>> count_in_range([0, 2, 2, 3, 5], 3, 2), count_in_range([], 0, 1)
+        (0, 0)
+    """
+    return max(0, bisect_right(sorted_arr, hi, key=key) - bisect_left(sorted_arr, lo, key=key))
+
+
+def _gallop_left(sorted_arr, item, lo: int, key: Optional[Callable]) -> int:
+    """bisect_left from lo that checks lo, lo+1, lo+3, lo+7, ... first: O(log d) for the answer lo+d."""
+    length, offset, last = len(sorted_arr), 1, lo
+    while lo + offset - 1 < length:
+        value = sorted_arr[lo + offset - 1] if key is None else key(sorted_arr[lo + offset - 1])
+        if not value < item:
+            break
+        last = lo + offset
+        offset <<= 1
+    return bisect_left(sorted_arr, item, last, min(lo + offset - 1, length), key)
+
+
+def search_many(sorted_arr, queries: Iterable, key: Optional[Callable] = None) -> List[Optional[int]]:
+    """
+    binary_search for every query, in the order of the queries. A NumPy array is searched with
+    numpy.searchsorted.
+
+    Idea:
+        Запросы упорядочиваются, и поиск каждого следующего запроса начинается с позиции,
+        найденной для предыдущего: сначала экспоненциальным шагом (галопом) находится отрезок,
+        содержащий ответ, а затем в нём выполняется двоичный поиск. Если ответы соседних
+        запросов близки, на запрос уходит несколько сравнений вместо log n.
+
+    Examples:
+        >>> search_many([0, 2, 2, 3, 5], [5, 1, 2, 0, 9, 2])
+        [4, None, 1, 0, None, 1]
+        >>> search_many([], [1]), search_many([1], [])
+        ([None], [])
+        >>> import random
+        >>> arr = sorted(random.randint(0, 999) for _ in range(1000))
+        >>> queries = [random.randint(-10, 1010) for _ in range(500)]
+        >>> search_many(arr, queries) == [binary_search(arr, query) for query in queries]
+        True
+    """
+    queries = list(queries)
+    if type(sorted_arr).__module__ == "numpy" and key is None:
+        import numpy
+        positions = numpy.searchsorted(sorted_arr, queries)
+        found = positions < len(sorted_arr)
+        found[found] = sorted_arr[positions[found]] == numpy.asarray(queries)[found]
+        return [position if hit else None for position, hit in zip(positions.tolist(), found.tolist())]
+    result: List[Optional[int]] = [None] * len(queries)
+    length, left = len(sorted_arr), 0
+    for i in sorted(range(len(queries)), key=queries.__getitem__):
+        query = queries[i]
+        left = _gallop_left(sorted_arr, query, left, key)
+        if left < length:
+            value = sorted_arr[left] if key is None else key(sorted_arr[left])
+            if value == query:
+                result[i] = left
+    return result
+
+
+class SortedFile:
+    """
+    Read-only sequence of the keys of a file of records of record_size bytes sorted by the key
+    at byte key_offset of every record. dtype is the array module type code of the key (native
+    byte order). The sequence functions of this module work on it directly.
+
+    Examples:
+        >>> import tempfile
+        >>> records = [(key, key * 10) for key in (2, 3, 3, 7, 11)]
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     path = os.path.join(folder, "records")
+        ...     with open(path, "wb") as file:
+        ...         array("q", [value for record in records for value in record]).tofile(file)
+        ...     with SortedFile(path, 16, 0, "q") as keys:
+        ...         print(len(keys), keys[3], keys.search(3), keys.search(4), count_in_range(keys, 3, 7))
+        ...         print(array("q", keys.record(keys.search(7))).tolist())
+        ...     print(binary_search_file(path, 16, 8, "q", 110))
+        5 7 1 None 3
+        [7, 70]
+        4
+    """
+
+    def __init__(self, path: str, record_size: int, key_offset: int = 0, dtype: str = "q") -> None:
+        self.record_size, self.key_offset, self.dtype = record_size, key_offset, dtype
+        self.width = array(dtype).itemsize
+        if not 0 <= key_offset <= record_size - self.width:
+            raise ValueError("key does not fit in the record")
+        size = os.path.getsize(path)
+        if size % record_size:
+            raise ValueError(f"size of {path} is not a multiple of the record size")
+        self.count = size // record_size
+        self.file = open(path, "rb")
+        # Пустой файл нельзя отобразить в память.
+        self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.view = memoryview(self.mapped) if size else memoryview(b"")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int):
+        if not 0 <= i < self.count:
+            raise IndexError("record index out of range")
+        start = i * self.record_size + self.key_offset
+        return self.view[start: start + self.width].cast(self.dtype)[0]
+
+    def record(self, i: int) -> bytes:
+        start = i * self.record_size
+        return bytes(self.view[start: start + self.record_size])
+
+    def search(self, item) -> Optional[int]:
+        """Index of the first record with key item or None."""
+        return binary_search(self, item)
+
+    def close(self) -> None:
+        self.view.release()
+        if self.mapped is not None:
+            self.mapped.close()
+        self.file.close()
+
+    def __enter__(self) -> "SortedFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def binary_search_file(path: str, record_size: int, key_offset: int, dtype: str, item) -> Optional[int]:
+    """Index of the first record of the file with key item or None; see SortedFile."""
+    with SortedFile(path, record_size, key_offset, dtype) as keys:
+        return keys.search(item)
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
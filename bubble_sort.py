@@ -10,9 +10,12 @@ Idea:
     перемещается на одну позицию к началу массива («всплывает» до нужной позиции, как пузырёк
     в воде — отсюда и название алгоритма).
 """
+from typing import Callable, Optional
 
+from sort_by_key import decorate, gather
 
-def bubble_sort(arr: list) -> list:
+
+def bubble_sort(arr: list, key: Optional[Callable] = None, reverse: bool = False) -> list:
     """
     Examples:
         >>> bubble_sort([])
@@ -33,18 +36,27 @@ def bubble_sort(arr: list) -> list:
         >>> arr = random.choices(string.ascii_letters + string.digits, k=100)
         >>> bubble_sort(arr) == sorted(arr)
         True
+        >>> bubble_sort(['bb', 'a', 'ccc', 'dd', 'e'], key=len, reverse=True)
+        ['ccc', 'bb', 'dd', 'a', 'e']
+        >>> arr = [(random.randint(0, 9), i) for i in range(100)]
+        >>> bubble_sort(arr, key=lambda item: item[0], reverse=True) == sorted(
+        ...     arr, key=lambda item: item[0], reverse=True)
+        True
     """
-    arr = arr.copy()
-    length = len(arr)
+    # Сравниваются только ключи, номера элементов index переставляются вместе с ними.
+    keys, index = decorate(arr, key, reverse)
+    length = len(keys)
     for i in range(length - 1):
         no_swap = True
         for j in range(length - 1 - i):
-            if arr[j] > arr[j + 1]:
+            if keys[j] > keys[j + 1]:
                 no_swap = False
-                arr[j], arr[j + 1] = arr[j + 1], arr[j]
+                keys[j], keys[j + 1] = keys[j + 1], keys[j]
+                if index is not None:
+                    index[j], index[j + 1] = index[j + 1], index[j]
         if no_swap:
             break
-    return arr
+    return gather(arr, keys, index, reverse)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+"""
+External (out-of-core) merge sort for binary files of fixed-width integer records that do not
+fit in memory. Records are native-endian integers of the array module type typecode.
+Time complexity: Θ(n log n), with Θ(n) reads and writes per merge pass.
+Idea:
+    Файл отображается в память (mmap) и читается кусками по memory байт. Каждый кусок
+    сортируется в памяти функцией merge_sort прямо в array, без упаковки чисел в объекты
+    Python, и записывается во временный файл — отсортированную серию. Вместе с буфером слияния
+    первый проход занимает около 2 * memory байт. Затем серии сливаются группами по fan_in штук k-путевым слиянием на куче (heapq.merge):
+    каждая серия читается блоками по buffer_size байт, результат тоже пишется блоками. Если серий
+    больше fan_in, слияние выполняется в несколько проходов, пока не останется одна серия.
+"""
+from typing import Iterator, List, NamedTuple, Optional
+from array import array
+from heapq import merge
+from time import perf_counter
+import mmap
+import os
+import shutil
+import tempfile
+
+from merge_sort import merge_sort
+
+
+class ExternalSortReport(NamedTuple):
+    size: int  # Размер файла в байтах.
+    runs: int  # Число отсортированных серий после первого прохода.
+    passes: int  # Число проходов слияния.
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """Sorted megabytes per second."""
+        return self.size / 2 ** 20 / self.seconds if self.seconds else float("inf")
+
+
+def _read_run(path: str, typecode: str, buffer_size: int) -> Iterator[int]:
+    with open(path, "rb") as file:
+        while True:
+            block = array(typecode, file.read(buffer_size))
+            if not block:
+                return
+            yield from block
+
+
+def _write_run(path: str, typecode: str, values: Iterator[int], buffer_size: int) -> None:
+    count = max(1, buffer_size // array(typecode).itemsize)
+    block = array(typecode)
+    with open(path, "wb") as file:
+        for value in values:
+            block.append(value)
+            if len(block) >= count:
+                block.tofile(file)
+                block = array(typecode)
+        block.tofile(file)
+
+
+def _sorted_runs(src: str, directory: str, typecode: str, memory: int) -> List[str]:
+    itemsize = array(typecode).itemsize
+    step = max(1, memory // itemsize) * itemsize
+    runs = []
+    with open(src, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for start in range(0, len(mapped), step):
+            # Кусок копируется из отображения сразу в array, без промежуточного bytes.
+            chunk = array(typecode)
+            with memoryview(mapped) as view:
+                chunk.frombytes(view[start: start + step])
+            merge_sort(chunk, inplace=True)
+            path = os.path.join(directory, f"run{len(runs)}")
+            with open(path, "wb") as run:
+                chunk.tofile(run)
+            runs.append(path)
+            del chunk
+    return runs
+
+
+def external_sort(src: str, dst: str, typecode: str = "q", memory: int = 64 * 2 ** 20, fan_in: int = 16,
+                  buffer_size: int = 2 ** 20, directory: Optional[str] = None) -> ExternalSortReport:
+    """
+    Sort the records of the file src into the file dst. memory is the size in bytes of a chunk
+    sorted in memory (the sort itself takes about twice as much), fan_in >= 2 is the number of runs
+    merged at once, buffer_size is the size of the read and write buffer of every run, directory is
+    where temporary runs are kept.
+
+    Examples:
+        >>> import random
+        >>> values = [random.randint(-2 ** 63, 2 ** 63 - 1) for _ in range(1000)]
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     src, dst = os.path.join(folder, "src"), os.path.join(folder, "dst")
+        ...     with open(src, "wb") as file:
+        ...         array("q", values).tofile(file)
+        ...     report = external_sort(src, dst, memory=800, fan_in=3, buffer_size=64)
+        ...     with open(dst, "rb") as file:
+        ...         result = array("q", file.read()).tolist()
+        >>> result == sorted(values)
+        True
+        >>> report.size, report.runs, report.passes
+        (8000, 10, 3)
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     src, dst = os.path.join(folder, "src"), os.path.join(folder, "dst")
+        ...     open(src, "wb").close()
+        ...     report = external_sort(src, dst, "H")
+        ...     print(os.path.getsize(dst), report.runs)
+        0 0
+        >>> external_sort("src", "dst", fan_in=1)
+        Traceback (most recent call last):
+        ...
+        ValueError: fan_in must be at least 2
+        >>> external_sort("src", "dst", memory=0)
+        Traceback (most recent call last):
+        ...
+        ValueError: memory must be positive
+    """
+    if fan_in < 2:
+        raise ValueError("fan_in must be at least 2")
+    if memory <= 0:
+        raise ValueError("memory must be positive")
+    if buffer_size <= 0:
+        raise ValueError("buffer_size must be positive")
+    start = perf_counter()
+    size = os.path.getsize(src)
+    if size % array(typecode).itemsize:
+        raise ValueError(f"size of {src} is not a multiple of the record size")
+    if not size:
+        open(dst, "wb").close()
+        return ExternalSortReport(0, 0, 0, perf_counter() - start)
+
+    with tempfile.TemporaryDirectory(dir=directory) as folder:
+        runs = _sorted_runs(src, folder, typecode, memory)
+        count, passes = len(runs), 0
+        while len(runs) > 1:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                group = runs[i: i + fan_in]
+                path = os.path.join(folder, f"pass{passes}_{len(merged)}")
+                _write_run(path, typecode, merge(*(_read_run(run, typecode, buffer_size) for run in group)),
+                           buffer_size)
+                for run in group:
+                    os.remove(run)
+                merged.append(path)
+            runs = merged
+            passes += 1
+        shutil.move(runs[0], dst)
+    return ExternalSortReport(size, count, passes, perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -9,9 +9,31 @@ Idea:
     любой момент (в начале каждой итерации главного цикла) карты в левой руке будут
     остортированы, и это будут те карты, которые первоначально лежали в стопке на столе.
 """
+from typing import Callable, Optional
+from array import array
+from bisect import bisect_right
 
+from sort_by_key import argsort, decorate, gather, sort_inplace
 
-def insertion_sort(arr: list) -> list:
+
+def _sort_keys(keys, index: Optional[array]) -> None:
+    """Sort keys in place, moving the items of index alongside."""
+    for insert_index in range(len(keys) - 1):
+        insert_value = keys[insert_index + 1]
+        temp_index = insert_index
+        while insert_index >= 0 and insert_value < keys[insert_index]:
+            keys[insert_index + 1] = keys[insert_index]
+            insert_index -= 1
+        if insert_index != temp_index:
+            keys[insert_index + 1] = insert_value
+            # Номер вставленного элемента переносится так же, как его ключ.
+            if index is not None:
+                index[insert_index + 1: temp_index + 2] = (
+                    index[temp_index + 1: temp_index + 2] + index[insert_index + 1: temp_index + 1])
+
+
+def insertion_sort(arr: list, key: Optional[Callable] = None, reverse: bool = False,
+                   inplace: bool = False) -> list:
     """
     Examples:
         >>> insertion_sort([])
@@ -32,16 +54,70 @@ def insertion_sort(arr: list) -> list:
         >>> arr = random.choices(string.ascii_letters + string.digits, k=100)
         >>> insertion_sort(arr) == sorted(arr)
         True
+        >>> insertion_sort(['bb', 'a', 'ccc', 'dd', 'e'], key=len, reverse=True)
+        ['ccc', 'bb', 'dd', 'a', 'e']
+        >>> arr = [(random.randint(0, 9), i) for i in range(100)]
+        >>> insertion_sort(arr, key=lambda item: item[0], reverse=True) == sorted(
+        ...     arr, key=lambda item: item[0], reverse=True)
+        True
+        >>> arr = [3, 1, 2]
+        >>> insertion_sort(arr, inplace=True) is arr, arr
+        (True, [1, 2, 3])
+        >>> insertion_argsort(['bb', 'a', 'ccc', 'dd', 'e'], key=len)
+        array('q', [1, 4, 0, 3, 2])
     """
-    arr = arr.copy()
-    for insert_index, insert_value in enumerate(arr[1:]):
-        temp_index = insert_index
-        while insert_index >= 0 and insert_value < arr[insert_index]:
-            arr[insert_index + 1] = arr[insert_index]
-            insert_index -= 1
-        if insert_index != temp_index:
-            arr[insert_index + 1] = insert_value
-    return arr
+    if inplace:
+        return sort_inplace(arr, _sort_keys, key, reverse)
+    keys, index = decorate(arr, key, reverse)
+    _sort_keys(keys, index)
+    return gather(arr, keys, index, reverse)
+
+
+def insertion_argsort(arr, key: Optional[Callable] = None, reverse: bool = False):
+    """Indices that stably sort arr, as an array('q') (or a NumPy array for NumPy input)."""
+    return argsort(arr, _sort_keys, key, reverse)
+
+
+def binary_insertion(arr: list, lo: int, start: int, hi: int, carry: Optional[list] = None) -> None:
+    """
+    Insert arr[start:hi] one by one into the sorted arr[lo:start] in place, finding each position
+    with a binary search (after equal items, so the sort is stable) and moving carry items alongside.
+    """
+    for i in range(max(start, lo + 1), hi):
+        value = arr[i]
+        pos = bisect_right(arr, value, lo, i)
+        if pos == i:
+            continue
+        arr[pos + 1: i + 1] = arr[pos: i]
+        arr[pos] = value
+        if carry is not None:
+            item = carry[i]
+            carry[pos + 1: i + 1] = carry[pos: i]
+            carry[pos] = item
+
+
+def binary_insertion_sort(arr: list, key: Optional[Callable] = None, reverse: bool = False) -> list:
+    """
+    Insertion sort that finds the place of every card with a binary search. It makes
+    Θ(n log n) comparisons, but still Θ(n ** 2) moves.
+
+    Examples:
+        >>> binary_insertion_sort([])
+        []
+        >>> binary_insertion_sort([0, 5, 3, 2, 2])
+        [0, 2, 2, 3, 5]
+        >>> binary_insertion_sort(['4', 'm', 'ye', 'da', '2', '17'])
+        ['17', '2', '4', 'da', 'm', 'ye']
+        >>> import random
+        >>> arr = random.sample(range(-50, 50), 100)
+        >>> binary_insertion_sort(arr) == sorted(arr)
+        True
+        >>> binary_insertion_sort(['bb', 'a', 'ccc', 'dd', 'e'], key=len, reverse=True)
+        ['ccc', 'bb', 'dd', 'a', 'e']
+    """
+    keys, index = decorate(arr, key, reverse)
+    binary_insertion(keys, 0, 1, len(keys), index)
+    return gather(arr, keys, index, reverse)
 
 
 if __name__ == "__main__":
@@ -9,7 +9,23 @@ Idea:
     половины. А непосредственно в функции сортировки слиянием необходимо сложить количество
     инверсий в левой половине, количество в правой, и количество инверсий, возникающих при
     слиянии этих частей.
+Alternative engines for large inputs: fenwick_inversions (a Fenwick tree over the ranks of the
+items), numpy_inversions (a vectorized bottom-up merge count) and parallel_inversions (chunks
+counted by worker processes, then cross-chunk inversions counted by merging the sorted chunks).
+All of them count exactly the same pairs as inversions_num. merge_count is an iterative variant of
+inversions_num that also returns the sorted items. InversionCounter keeps the count of
+a stream or of a sliding window of its last items up to date in O(log n) per item.
 """
+from typing import Iterable, Optional, Tuple
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+import os
+
+from sort_by_key import typecode
 
 
 def modified_merge(arr: list, s: int, m: int, e: int) -> int:
@@ -68,6 +84,396 @@ def inversions_num(arr: list) -> int:
     return modified_merge_sort(arr_copy, 0, len(arr) - 1)
 
 
+# Блоки не длиннее INSERTION_CUTOFF сортируются вставками до первого прохода слияния.
+INSERTION_CUTOFF = 8
+
+
+def merge_count(arr) -> Tuple[int, list]:
+    """
+    Number of inversions and the sorted items: an array of the same type code for ints and
+    floats (see sort_by_key.typecode), a list otherwise.
+
+    Idea:
+        Восходящая сортировка слиянием без рекурсии и без срезов. Сначала блоки длины
+        INSERTION_CUTOFF сортируются вставками: каждый сдвиг элемента вправо устраняет ровно одну
+        инверсию. Затем соседние блоки сливаются проходами с удваивающейся шириной, и при
+        каждом переносе элемента из правого блока прибавляется число оставшихся элементов левого.
+        Проходы попеременно пишут в один из двух буферов, выделенных один раз.
+
+    Examples:
+        >>> merge_count([5, 2, 1, 7, 3, 2, 1])
+        (13, array('q', [1, 1, 2, 2, 3, 5, 7]))
+        >>> merge_count(['4', 'm', 'ye', 'da', '2', '17'])
+        (11, ['17', '2', '4', 'da', 'm', 'ye'])
+        >>> merge_count([])
+        (0, [])
+        >>> import random
+        >>> arr = [random.randint(-100, 100) for _ in range(1000)]
+        >>> count, result = merge_count(arr)
+        >>> count == inversions_num(arr), list(result) == sorted(arr)
+        (True, True)
+    """
+    code = typecode(arr)
+    src = array(code, arr) if code else list(arr)
+    length = len(src)
+    count = 0
+    for lo in range(0, length, INSERTION_CUTOFF):
+        for i in range(lo + 1, min(lo + INSERTION_CUTOFF, length)):
+            value, j = src[i], i - 1
+            while j >= lo and value < src[j]:
+                src[j + 1] = src[j]
+                j -= 1
+            count += i - 1 - j
+            src[j + 1] = value
+    dst = src[:]
+    width = INSERTION_CUTOFF
+    while width < length:
+        for lo in range(0, length, 2 * width):
+            mid, hi = min(lo + width, length), min(lo + 2 * width, length)
+            if mid == hi:
+                dst[lo: hi] = src[lo: hi]
+                continue
+            # Текущие элементы блоков держатся в переменных, чтобы каждый читался из буфера один раз.
+            i, j, k = lo, mid, lo
+            left, right = src[i], src[j]
+            while True:
+                if right < left:
+                    dst[k] = right
+                    count += mid - i
+                    j += 1
+                    k += 1
+                    if j == hi:
+                        break
+                    right = src[j]
+                else:
+                    dst[k] = left
+                    i += 1
+                    k += 1
+                    if i == mid:
+                        break
+                    left = src[i]
+            dst[k: hi] = src[i: mid] if i < mid else src[j: hi]
+        src, dst = dst, src
+        width *= 2
+    return count, src
+
+
+class FenwickTree:
+    """
+    Counts at positions 0..size-1 with point updates and prefix sums, both in O(log size).
+
+    Examples:
+        >>> tree = FenwickTree(5)
+        >>> tree.add(1), tree.add(3, 2), tree.add(4)
+        (None, None, None)
+        >>> tree.prefix(0), tree.prefix(2), tree.prefix(4), tree.prefix(5)
+        (0, 1, 3, 4)
+    """
+
+    def __init__(self, size: int) -> None:
+        # Ячейка i (с единицы) хранит сумму по позициям (i - (i & -i), i].
+        self.tree = array("q", bytes(8 * (size + 1)))
+
+    def add(self, i: int, delta: int = 1) -> None:
+        tree, i = self.tree, i + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i: int) -> int:
+        """Sum over positions 0..i-1."""
+        tree, total = self.tree, 0
+        while i:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+
+def ranks(arr) -> Tuple[array, int]:
+    """
+    Ranks of the items (equal items get equal ranks) and the number of ranks. Integers of a small
+    range are ranked by value - min(arr), anything else by sorting the distinct items.
+
+    Examples:
+        >>> ranks([30, 10, 20, 10])
+        (array('q', [2, 0, 1, 0]), 3)
+        >>> ranks([5, 1000000, -7])
+        (array('q', [1, 2, 0]), 3)
+    """
+    if not arr:
+        return array("q"), 0
+    if typecode(arr) == "q":
+        low, high = min(arr), max(arr)
+        if high - low < 2 * len(arr):
+            return array("q", (item - low for item in arr)), high - low + 1
+    distinct = sorted(set(arr))
+    rank = {item: i for i, item in enumerate(distinct)}
+    return array("q", map(rank.__getitem__, arr)), len(distinct)
+
+
+def fenwick_inversions(arr) -> int:
+    """
+    Idea:
+        Элементы просматриваются слева направо, дерево Фенвика хранит, сколько раз уже встретился
+        каждый ранг. Инверсий с текущим элементом столько, сколько среди уже просмотренных
+        элементов строго больших: их число минус число не больших (префиксная сумма по рангам).
+
+    Examples:
+        >>> fenwick_inversions([]), fenwick_inversions([5, 2, 1, 7, 3, 2, 1])
+        (0, 13)
+        >>> fenwick_inversions(['4', 'm', 'ye', 'da', '2', '17'])
+        11
+        >>> import random
+        >>> arr = [random.randint(0, 50) for _ in range(1000)]
+        >>> fenwick_inversions(arr) == inversions_num(arr)
+        True
+    """
+    values, size = ranks(arr)
+    # Операции дерева записаны прямо в цикле, без вызовов методов FenwickTree.
+    tree = FenwickTree(size).tree
+    count = 0
+    for seen, rank in enumerate(values):
+        i, not_greater = rank + 1, 0
+        while i:
+            not_greater += tree[i]
+            i &= i - 1
+        count += seen - not_greater
+        i = rank + 1
+        while i <= size:
+            tree[i] += 1
+            i += i & -i
+    return count
+
+
+def numpy_inversions(arr) -> int:
+    """
+    Inversions of a numeric list, array or NumPy array counted with NumPy.
+
+    Idea:
+        Восходящая сортировка слиянием, в которой каждый уровень обрабатывается целиком
+        векторными операциями. Элементы заменяются рангами r < n, и на уровне с шириной блока
+        width элементу сопоставляется ключ pair * n + r, где pair — номер пары соседних блоков.
+        Ключи левых блоков, взятые подряд, образуют отсортированный массив, поэтому для всех
+        элементов правых блоков число больших элементов левого блока той же пары находится
+        одним вызовом searchsorted. Сортировка ключей сливает пары блоков для следующего уровня.
+    """
+    import numpy
+    values = numpy.asarray(arr)
+    length = len(values)
+    if length < 2:
+        return 0
+    order = numpy.argsort(values, kind="stable")
+    ordered = values[order]
+    keys = numpy.empty(length, dtype=numpy.int64)
+    keys[order] = numpy.concatenate(([0], numpy.cumsum(ordered[1:] != ordered[:-1])))
+    positions = numpy.arange(length, dtype=numpy.int64)
+    count, width = 0, 1
+    while width < length:
+        pair = positions // (2 * width)
+        keys += pair * length
+        left = positions % (2 * width) < width
+        left_keys, right_keys = keys[left], keys[~left]
+        ends = numpy.searchsorted(left_keys, (pair[~left] + 1) * length)
+        count += int((ends - numpy.searchsorted(left_keys, right_keys, side="right")).sum())
+        keys = numpy.sort(keys) - pair * length
+        width *= 2
+    return count
+
+
+def _count_chunk(name: str, code: str, lo: int, hi: int) -> int:
+    """Inversions inside arr[lo:hi] of the shared array, which is sorted in place."""
+    memory = SharedMemory(name)
+    view = memory.buf.cast(code)
+    try:
+        chunk = view[lo: hi].tolist()
+        count = modified_merge_sort(chunk, 0, len(chunk) - 1)
+        view[lo: hi] = array(code, chunk)
+    finally:
+        # Представление освобождается до close, иначе ошибка сменится на BufferError.
+        view.release()
+        memory.close()
+    return count
+
+
+def _count_merge(name: str, code: str, lo: int, mid: int, hi: int) -> int:
+    """Inversions between the sorted arr[lo:mid] and arr[mid:hi] of the shared array, merged in place."""
+    memory = SharedMemory(name)
+    view = memory.buf.cast(code)
+    try:
+        chunk = view[lo: hi].tolist()
+        count = modified_merge(chunk, 0, mid - lo, hi - lo - 1)
+        view[lo: hi] = array(code, chunk)
+    finally:
+        view.release()
+        memory.close()
+    return count
+
+
+def parallel_inversions(arr, workers: Optional[int] = None) -> int:
+    """
+    Idea:
+        Массив копируется в разделяемую память и делится на workers частей. Каждый процесс
+        считает инверсии внутри своей части и сортирует её. Инверсии между частями считаются
+        слиянием соседних отсортированных частей, как на верхних уровнях сортировки слиянием;
+        слияния одного уровня тоже выполняются параллельно. Массивы не из чисел одного типа
+        обрабатываются функцией fenwick_inversions в текущем процессе, а нехешируемые
+        элементы — функцией merge_count.
+
+    Examples:
+        >>> import random
+        >>> arr = [random.randint(-100, 100) for _ in range(3000)]
+        >>> parallel_inversions(arr, workers=3) == inversions_num(arr)
+        True
+        >>> parallel_inversions([3, 2, 1], workers=2), parallel_inversions(['b', 'a'], workers=2)
+        (3, 1)
+        >>> parallel_inversions([[1], [0]], workers=2) == inversions_num([[1], [0]])
+        True
+    """
+    workers = workers or os.cpu_count() or 1
+    code = typecode(arr)
+    length = len(arr)
+    if code is None or length < 2 * workers:
+        try:
+            return fenwick_inversions(arr)
+        except TypeError:
+            # Нехешируемые элементы (например, списки) нельзя ранжировать через set и dict.
+            return merge_count(arr)[0]
+
+    data = array(code, arr)
+    memory = SharedMemory(create=True, size=length * data.itemsize)
+    try:
+        view = memory.buf.cast(code)
+        try:
+            view[:] = data
+        finally:
+            view.release()
+        bounds = [length * i // workers for i in range(workers + 1)]
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_count_chunk, memory.name, code, lo, hi)
+                       for lo, hi in zip(bounds, bounds[1:])]
+            count = sum(future.result() for future in futures)
+            # Слияние соседних частей по уровням, пока не останется одна часть.
+            while len(bounds) > 2:
+                merges = [bounds[i: i + 3] for i in range(0, len(bounds) - 2, 2)]
+                futures = [executor.submit(_count_merge, memory.name, code, lo, mid, hi)
+                           for lo, mid, hi in merges]
+                count += sum(future.result() for future in futures)
+                bounds = bounds[::2] if len(bounds) % 2 else bounds[::2] + bounds[-1:]
+    finally:
+        memory.close()
+        memory.unlink()
+    return count
+
+
+def kendall_tau_distance(first: list, second: list) -> int:
+    """
+    Number of pairs of items ranked in opposite orders by two rankings of the same items.
+
+    Examples:
+        >>> kendall_tau_distance(['a', 'b', 'c', 'd'], ['b', 'a', 'd', 'c'])
+        2
+        >>> kendall_tau_distance([1, 2, 3], [3, 2, 1])
+        3
+    """
+    position = {item: i for i, item in enumerate(first)}
+    return fenwick_inversions([position[item] for item in second])
+
+
+class InversionCounter:
+    """
+    Number of inversions of a sequence that grows at the end and shrinks at the start. Items must
+    belong to universe, the values known in advance (they are ranked for the Fenwick tree). With
+    window, push keeps only the last window items.
+
+    Idea:
+        Дерево Фенвика хранит, сколько элементов каждого ранга сейчас в последовательности.
+        Новый элемент в конце образует инверсии со всеми строго большими элементами, а удаляемый
+        первый элемент — со всеми строго меньшими; их число — разность префиксных сумм.
+
+    Examples:
+        >>> counter = InversionCounter(range(10))
+        >>> for item in [5, 2, 1, 7]:
+        ...     counter.push(item)
+        >>> counter.count, len(counter)
+        (3, 4)
+        >>> counter.pop_oldest(), counter.count
+        (5, 1)
+        >>> import random
+        >>> stream = [random.randint(0, 20) for _ in range(500)]
+        >>> counter = InversionCounter(range(21), window=50)
+        >>> counts = []
+        >>> for i, item in enumerate(stream):
+        ...     counter.push(item)
+        ...     counts.append(counter.count)
+        >>> counts == [inversions_num(stream[max(0, i - 49): i + 1]) for i in range(len(stream))]
+        True
+    """
+
+    def __init__(self, universe: Iterable, window: Optional[int] = None) -> None:
+        distinct = sorted(set(universe))
+        self.rank = {item: i for i, item in enumerate(distinct)}
+        self.tree = FenwickTree(len(distinct))
+        self.items: deque = deque()
+        self.window = window
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def push(self, item) -> None:
+        rank = self.rank[item]
+        self.count += len(self.items) - self.tree.prefix(rank + 1)
+        self.tree.add(rank)
+        self.items.append(item)
+        if self.window is not None and len(self.items) > self.window:
+            self.pop_oldest()
+
+    def pop_oldest(self):
+        item = self.items.popleft()
+        rank = self.rank[item]
+        self.count -= self.tree.prefix(rank)
+        self.tree.add(rank, -1)
+        return item
+
+
+def _status(field: str) -> int:
+    """Field of /proc/self/status in KiB, such as VmRSS or VmHWM (the peak of VmRSS)."""
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _peak_rss(engine: str, size: int) -> Tuple[float, int]:
+    """Time and growth of the peak resident set size in KiB of one engine on size random ints."""
+    import random
+    arr = [random.getrandbits(62) for _ in range(size)]
+    # Запись 5 в clear_refs сбрасывает VmHWM до текущего VmRSS.
+    with open("/proc/self/clear_refs", "w") as file:
+        file.write("5")
+    base = _status("VmRSS")
+    start = perf_counter()
+    if engine == "inversions_num":
+        inversions_num(arr)
+    else:
+        merge_count(arr)
+    return perf_counter() - start, _status("VmHWM") - base
+
+
+def benchmark_memory(sizes=(10 ** 5, 10 ** 6, 10 ** 7)) -> None:
+    """
+    Print the time of inversions_num and merge_count and how much each raises the peak RSS above
+    the RSS with the input list built (Linux only). Every run takes place in a fresh process.
+    """
+    print(f"{'n':>10} {'engine':>15} {'seconds':>8} {'peak RSS growth, MiB':>21}")
+    context = get_context("spawn")
+    for size in sizes:
+        for engine in ("inversions_num", "merge_count"):
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                seconds, peak = executor.submit(_peak_rss, engine, size).result()
+            print(f"{size:>10} {engine:>15} {seconds:8.2f} {peak / 1024:21.1f}")
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -9,8 +9,13 @@ Idea:
     будет положительным, то он гарантировано создаст единичный подмассив (из него самого)
     с локальной суммой большей, чем эта. Если же элемент arr[i] положителен и сумма
     текущего подмассива больше максимальной, то arr[low:i+1] становится максимальным подмассивом.
+KadaneState runs the same scan over a stream that arrives in pieces (iterables, NumPy chunks,
+binary files), and merge joins the states of two adjacent pieces computed separately.
 """
 from __future__ import annotations
+from array import array
+from copy import copy
+from typing import Iterable
 
 
 def max_sum_subarray(arr: list) -> tuple[int, int, int]:
@@ -40,6 +45,164 @@ def max_sum_subarray(arr: list) -> tuple[int, int, int]:
     return max_low, max_high, max_sum
 
 
+class KadaneState:
+    """
+    Summary of the items seen so far of a stream whose first item has the absolute index offset:
+    the maximum subarray best = (low, high, sum) and the maximum prefix and suffix. Among
+    subarrays of equal sum the one with the least high wins, then the one with the least low.
+
+    Idea:
+        Для склейки соседних кусков достаточно знать у каждого сумму, максимальный префикс,
+        максимальный суффикс и максимальный подмассив: максимальный подмассив склейки лежит
+        в одном куске или состоит из суффикса левого и префикса правого. Добавление элемента —
+        склейка с куском из одного элемента; максимальный суффикс при этом обновляется, как
+        текущая сумма в алгоритме Кадане.
+
+    Examples:
+        >>> state = KadaneState()
+        >>> state.extend(iter([-2, -5, 6, -2]))
+        >>> state.best
+        (2, 2, 6)
+        >>> state.extend([-3, 1, 5, -6])
+        >>> state.best, len(state)
+        ((2, 6, 7), 8)
+        >>> arr = [13, -3, -25, 20, -3, -16, -23, 18, 20, -7, 12, -5, -22, 15, -4, 7]
+        >>> merge(KadaneState.of(arr[:9]), KadaneState.of(arr[9:], offset=9)).best
+        (7, 10, 43)
+        >>> KadaneState.of([-4, -2]).best, KadaneState().best
+        ((1, 1, -2), (-1, -1, -inf))
+        >>> import random
+        >>> arr = [random.randint(-10, 10) for _ in range(300)]
+        >>> cuts = sorted(random.sample(range(1, 300), 5))
+        >>> states = [KadaneState.of(arr[lo: hi], lo) for lo, hi in zip([0] + cuts, cuts + [300])]
+        >>> joined = states[0]
+        >>> for state in states[1:]:
+        ...     joined = merge(joined, state)
+        >>> joined.best == KadaneState.of(arr).best
+        True
+        >>> low, high, total = joined.best
+        >>> total == sum(arr[low: high + 1]) == max(
+        ...     sum(arr[i: j + 1]) for i in range(300) for j in range(i, 300))
+        True
+    """
+
+    def __init__(self, offset: int = 0) -> None:
+        self.offset = offset
+        self.length = 0
+        self.total = 0
+        self.prefix_high, self.prefix_sum = offset - 1, float("-inf")
+        self.suffix_low, self.suffix_sum = offset, float("-inf")
+        self.low = self.high = -1
+        self.sum = float("-inf")
+
+    @classmethod
+    def of(cls, items, offset: int = 0) -> KadaneState:
+        state = cls(offset)
+        state.extend(items)
+        return state
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def best(self) -> tuple[int, int, int]:
+        return self.low, self.high, self.sum
+
+    def push(self, item) -> None:
+        i = self.offset + self.length
+        self.length += 1
+        self.total += item
+        if self.total > self.prefix_sum:
+            self.prefix_high, self.prefix_sum = i, self.total
+        # Текущая сумма алгоритма Кадане: суффикс продлевается, если он не отрицателен.
+        if self.suffix_sum >= 0:
+            self.suffix_sum += item
+        else:
+            self.suffix_low, self.suffix_sum = i, item
+        if self.suffix_sum > self.sum:
+            self.low, self.high, self.sum = self.suffix_low, i, self.suffix_sum
+
+    def extend(self, items: Iterable) -> None:
+        """Push every item; a NumPy array is summarized with vectorized operations and merged."""
+        if type(items).__module__ == "numpy":
+            vars(self).update(vars(merge(self, _numpy_state(items, self.offset + self.length))))
+            return
+        for item in items:
+            self.push(item)
+
+
+def merge(a: KadaneState, b: KadaneState) -> KadaneState:
+    """State of the stream of a followed by the stream of b, which must start right after a."""
+    if b.offset != a.offset + a.length:
+        raise ValueError("states are not adjacent")
+    if not b.length:
+        return copy(a)
+    if not a.length:
+        return copy(b)
+    result = KadaneState(a.offset)
+    result.length = a.length + b.length
+    result.total = a.total + b.total
+    if a.total + b.prefix_sum > a.prefix_sum:
+        result.prefix_high, result.prefix_sum = b.prefix_high, a.total + b.prefix_sum
+    else:
+        result.prefix_high, result.prefix_sum = a.prefix_high, a.prefix_sum
+    if a.suffix_sum + b.total >= b.suffix_sum:
+        result.suffix_low, result.suffix_sum = a.suffix_low, a.suffix_sum + b.total
+    else:
+        result.suffix_low, result.suffix_sum = b.suffix_low, b.suffix_sum
+    # Кандидаты упорядочены по возрастанию high, поэтому при равных суммах побеждает первый.
+    candidates = [a.best, (a.suffix_low, b.prefix_high, a.suffix_sum + b.prefix_sum), b.best]
+    result.low, result.high, result.sum = max(candidates, key=lambda best: (best[2], -best[1], -best[0]))
+    return result
+
+
+def _numpy_state(chunk, offset: int) -> KadaneState:
+    """KadaneState of a one-dimensional NumPy array computed from its prefix sums."""
+    import numpy
+    state = KadaneState(offset)
+    if not len(chunk):
+        return state
+    sums = numpy.cumsum(chunk)
+    before = numpy.concatenate(([0], sums[:-1]))  # Сумма элементов перед каждым элементом.
+    lowest = numpy.minimum.accumulate(before)
+    high = int(numpy.argmax(sums - lowest))
+    low = int(numpy.argmin(before[: high + 1]))
+    prefix_high = int(numpy.argmax(sums))
+    suffix = sums[-1] - before
+    suffix_low = int(numpy.argmax(suffix))
+    state.length, state.total = len(chunk), sums[-1].item()
+    state.prefix_high, state.prefix_sum = offset + prefix_high, sums[prefix_high].item()
+    state.suffix_low, state.suffix_sum = offset + suffix_low, suffix[suffix_low].item()
+    state.low, state.high, state.sum = offset + low, offset + high, (sums[high] - before[low]).item()
+    return state
+
+
+def kadane_file(path: str, typecode: str = "d", buffer_size: int = 2 ** 20) -> KadaneState:
+    """
+    KadaneState of a binary file of numbers of the array module type code, read in blocks of
+    buffer_size bytes, so the file may be far larger than memory.
+
+    Examples:
+        >>> import os, tempfile
+        >>> with tempfile.TemporaryDirectory() as folder:
+        ...     path = os.path.join(folder, "deltas")
+        ...     with open(path, "wb") as file:
+        ...         array("q", [-2, -5, 6, -2, -3, 1, 5, -6]).tofile(file)
+        ...     print(kadane_file(path, "q", buffer_size=16).best, kadane_file(path, "q", buffer_size=3).best)
+        (2, 6, 7) (2, 6, 7)
+    """
+    itemsize = array(typecode).itemsize
+    # Блок — целое число элементов, но не меньше одного.
+    block_size = max(itemsize, buffer_size - buffer_size % itemsize)
+    state = KadaneState()
+    with open(path, "rb") as file:
+        while True:
+            block = array(typecode, file.read(block_size))
+            if not block:
+                return state
+            state.extend(block)
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -12,8 +12,14 @@ Idea:
     среди всех подмассивов из каждого положения. Максимальные подмассивы arr[low:mid+1] и
     arr[mid+1:high+1] находим рекурсивно. Максимальный подмассив, пересекающий среднюю точку
     находим с помощью функции max_sum_crossing_subarray за время Θ(n).
+MaxSubarrayTree keeps the results of the combine step for every node of a segment tree, so the
+maximum subarray of any range is found in Θ(log n) and a point update takes Θ(log n).
 """
 from __future__ import annotations
+from array import array
+from typing import Optional
+
+from sort_by_key import typecode
 
 
 def max_sum_crossing_subarray(arr: list, low: int, mid: int, high: int) -> tuple[int, int, int]:
@@ -77,6 +83,151 @@ def max_sum_subarray_recursive(arr: list) -> tuple[int, int, int]:
     return _max_sum_subarray_recursive(arr, 0, len(arr) - 1)
 
 
+# Сводка отрезка: (сумма, лучший префикс, его конец, лучший суффикс, его начало,
+# лучшая сумма, начало и конец лучшего подмассива).
+Summary = tuple
+
+
+def _combine(left: Optional[Summary], right: Optional[Summary]) -> Optional[Summary]:
+    """Summary of two adjacent ranges, None being the empty one. Ties go to the least high, then low."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    total, prefix, prefix_high, suffix, suffix_low, best, best_low, best_high = left
+    r_total, r_prefix, r_prefix_high, r_suffix, r_suffix_low, r_best, r_best_low, r_best_high = right
+    if total + r_prefix > prefix:
+        prefix, prefix_high = total + r_prefix, r_prefix_high
+    # Подмассив, пересекающий границу, — как в max_sum_crossing_subarray.
+    cross = suffix + r_prefix
+    # Лучший подмассив левого отрезка заканчивается раньше пересекающего, а пересекающий при
+    # одинаковом конце начинается раньше лучшего подмассива правого отрезка.
+    if cross > best:
+        best, best_low, best_high = cross, suffix_low, r_prefix_high
+    if r_best > best or r_best == best and r_best_high < best_high:
+        best, best_low, best_high = r_best, r_best_low, r_best_high
+    if suffix + r_total >= r_suffix:
+        suffix = suffix + r_total
+    else:
+        suffix, suffix_low = r_suffix, r_suffix_low
+    return total + r_total, prefix, prefix_high, suffix, suffix_low, best, best_low, best_high
+
+
+class MaxSubarrayTree:
+    """
+    Segment tree over arr for maximum subarray queries on ranges and point updates.
+
+    Idea:
+        Дерево хранится в массивах длины 2n: листья — в ячейках n..2n-1, у узла k дети 2k и
+        2k+1. Для каждого узла хранятся сумма, лучший префикс, лучший суффикс и лучший
+        подмассив его отрезка, поэтому шаг комбинирования из _max_sum_subarray_recursive
+        выполняется за Θ(1): пересекающий середину подмассив — это лучший суффикс левого
+        отрезка и лучший префикс правого. Запрос собирает отрезок из Θ(log n) узлов слева
+        направо, обновление пересчитывает предков листа.
+
+    Examples:
+        >>> arr = [13, -3, -25, 20, -3, -16, -23, 18, 20, -7, 12, -5, -22, 15, -4, 7]
+        >>> tree = MaxSubarrayTree(arr)
+        >>> tree.query(0, 15), tree.query(0, 6), tree.query(13, 13)
+        ((7, 10, 43), (3, 3, 20), (13, 13, 15))
+        >>> tree.update(12, 30)
+        >>> tree.query(0, 15)
+        (7, 15, 86)
+        >>> MaxSubarrayTree([2 ** 62, 2 ** 62]).query(0, 1)
+        (0, 1, 9223372036854775808)
+        >>> tree = MaxSubarrayTree([1, 2, 3])
+        >>> tree.update(1, 2.5), tree.query(0, 2)
+        (None, (0, 2, 6.5))
+        >>> tree = MaxSubarrayTree([1, 2, 3])
+        >>> tree.update(0, 2 ** 63), tree.query(0, 2)
+        (None, (0, 2, 9223372036854775813))
+        >>> import random
+        >>> arr = [random.randint(-10, 10) for _ in range(200)]
+        >>> tree = MaxSubarrayTree(arr)
+        >>> for _ in range(100):
+        ...     i = random.randrange(200)
+        ...     arr[i] = random.randint(-10, 10)
+        ...     tree.update(i, arr[i])
+        ...     low = random.randrange(200)
+        ...     high = random.randrange(low, 200)
+        ...     found = tree.query(low, high)
+        ...     assert found[2] == max_sum_subarray_recursive(arr[low: high + 1])[2]
+        ...     assert found[2] == sum(arr[found[0]: found[1] + 1])
+    """
+
+    def __init__(self, arr) -> None:
+        size = len(arr)
+        self.size = size
+        code = typecode(arr)
+        # Суммы хранятся в компактных массивах, если все элементы — вещественные или все — целые
+        # и сумма любого отрезка заведомо помещается в 64 бита.
+        self.limit = max(map(abs, arr), default=0)
+        if code == "q" and not self._fits_q(self.limit):
+            code = None
+        if code:
+            self.sums = [array(code, bytes(array(code).itemsize * 2 * size)) for _ in range(4)]
+        else:
+            self.sums = [[0] * (2 * size) for _ in range(4)]
+        self.positions = [array("q", bytes(16 * size)) for _ in range(4)]
+        for i, value in enumerate(arr):
+            self._store(size + i, (value, value, i, value, i, value, i, i))
+        # Массовое построение снизу вверх за Θ(n).
+        for node in range(size - 1, 0, -1):
+            self._store(node, _combine(self._load(2 * node), self._load(2 * node + 1)))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _load(self, node: int) -> Summary:
+        total, prefix, suffix, best = self.sums
+        prefix_high, suffix_low, best_low, best_high = self.positions
+        return (total[node], prefix[node], prefix_high[node], suffix[node], suffix_low[node],
+                best[node], best_low[node], best_high[node])
+
+    def _store(self, node: int, summary: Summary) -> None:
+        total, prefix, suffix, best = self.sums
+        prefix_high, suffix_low, best_low, best_high = self.positions
+        (total[node], prefix[node], prefix_high[node], suffix[node], suffix_low[node],
+         best[node], best_low[node], best_high[node]) = summary
+
+    def _fits_q(self, limit) -> bool:
+        return self.size * limit < 1 << 63
+
+    def update(self, i: int, value) -> None:
+        """Set arr[i] to value. A value that the compact buffers cannot hold switches them to lists."""
+        buffer = self.sums[0]
+        if isinstance(buffer, array):
+            self.limit = max(self.limit, abs(value))
+            fits = type(value) is float if buffer.typecode == "d" else (
+                type(value) is int and self._fits_q(self.limit))
+            if not fits:
+                self.sums = [buffer.tolist() for buffer in self.sums]
+        node = self.size + i
+        self._store(node, (value, value, i, value, i, value, i, i))
+        node //= 2
+        while node:
+            self._store(node, _combine(self._load(2 * node), self._load(2 * node + 1)))
+            node //= 2
+
+    def query(self, low: int, high: int) -> tuple[int, int, int]:
+        """Maximum subarray (low, high, sum) of arr[low:high+1]."""
+        if not 0 <= low <= high < self.size:
+            raise IndexError("range out of bounds")
+        left = right = None
+        lo, hi = low + self.size, high + self.size + 1
+        while lo < hi:
+            if lo & 1:
+                left = _combine(left, self._load(lo))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = _combine(self._load(hi), right)
+            lo //= 2
+            hi //= 2
+        summary = _combine(left, right)
+        return summary[6], summary[7], summary[5]
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -9,7 +9,33 @@ Idea:
     Комбинирование:
         Сливаем такие два подмассива с помощью функции merge для получения окончательного
         отсортированного ответа.
+    Подмассивы задаются границами индексов, а не срезами. Кроме копии массива используется один
+    вспомогательный буфер той же длины: на каждом уровне рекурсии они меняются ролями (половины
+    сортируются в одном, а сливаются в другой), так что копирование между ними не требуется.
+    Короткие подмассивы сортируются вставками, а слияние пропускается, если последний элемент
+    левой половины не больше первого элемента правой.
+natural_merge_sort is an adaptive variant for nearly sorted data. It takes Θ(n) comparisons on
+sorted input and Θ(n log n) in the worst case. parallel_merge_sort sorts large arrays of numbers
+on several processes through shared memory. merge_sort(..., inplace=True) sorts the caller's list
+or array itself, and merge_argsort returns the sorting permutation without moving the data.
 """
+from typing import Callable, List, Optional, Tuple
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge as heap_merge
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+import os
+
+from insertion_sort import binary_insertion
+from sort_by_key import argsort, decorate, gather, sort_inplace, typecode
+
+
+# Подмассивы не длиннее INSERTION_CUTOFF сортируются вставками.
+INSERTION_CUTOFF = 16
+# Число побед одной серии подряд, после которого слияние переходит в режим галопа.
+MIN_GALLOP = 7
 
 
 def merge(left: list, right: list) -> list:
@@ -26,16 +52,105 @@ def merge(left: list, right: list) -> list:
         >>> merge(['17', '4', 'm'], ['2', 'da', 'ye'])
         ['17', '2', '4', 'da', 'm', 'ye']
     """
-    def _merge():
-        while left and right:
-            yield (left if left[0] <= right[0] else right).pop(0)
-        yield from left
-        yield from right
+    result = left + right
+    _merge(result.copy(), result, 0, len(left), len(result))
+    return result
+
+
+def _insertion_sort(arr: list, lo: int, hi: int, carry: Optional[list]) -> None:
+    for i in range(lo + 1, hi):
+        value = arr[i]
+        j = i - 1
+        if not value < arr[j]:
+            continue
+        if carry is not None:
+            item = carry[i]
+        while j >= lo and value < arr[j]:
+            arr[j + 1] = arr[j]
+            if carry is not None:
+                carry[j + 1] = carry[j]
+            j -= 1
+        arr[j + 1] = value
+        if carry is not None:
+            carry[j + 1] = item
+
+
+def _merge(src: list, dst: list, lo: int, mid: int, hi: int,
+           src_carry: Optional[list] = None, dst_carry: Optional[list] = None) -> None:
+    """Merge the sorted src[lo:mid] and src[mid:hi] into dst[lo:hi], moving carry items alongside."""
+    i, j, k = lo, mid, lo
+    if src_carry is None:
+        while i < mid and j < hi:
+            if src[j] < src[i]:
+                dst[k] = src[j]
+                j += 1
+            else:
+                dst[k] = src[i]
+                i += 1
+            k += 1
+    else:
+        while i < mid and j < hi:
+            if src[j] < src[i]:
+                dst[k], dst_carry[k] = src[j], src_carry[j]
+                j += 1
+            else:
+                dst[k], dst_carry[k] = src[i], src_carry[i]
+                i += 1
+            k += 1
+    # Остаток одной из половин копируется одним срезом.
+    if i < mid:
+        dst[k: hi] = src[i: mid]
+        if src_carry is not None:
+            dst_carry[k: hi] = src_carry[i: mid]
+    else:
+        dst[k: hi] = src[j: hi]
+        if src_carry is not None:
+            dst_carry[k: hi] = src_carry[j: hi]
+
+
+def _merge_sort(src: list, dst: list, lo: int, hi: int,
+                src_carry: Optional[list] = None, dst_carry: Optional[list] = None) -> None:
+    """Sort dst[lo:hi]; src[lo:hi] must hold the same items and is used as the scratch buffer."""
+    if hi - lo <= INSERTION_CUTOFF:
+        _insertion_sort(dst, lo, hi, dst_carry)
+        return
+    mid = (lo + hi) // 2
+    _merge_sort(dst, src, lo, mid, dst_carry, src_carry)
+    _merge_sort(dst, src, mid, hi, dst_carry, src_carry)
+    if not src[mid] < src[mid - 1]:
+        dst[lo: hi] = src[lo: hi]
+        if src_carry is not None:
+            dst_carry[lo: hi] = src_carry[lo: hi]
+        return
+    _merge(src, dst, lo, mid, hi, src_carry, dst_carry)
+
+
+def _copy(keys):
+    """
+    Scratch copy of keys that supports the same slice assignments as keys. A slice of a memoryview
+    or of a NumPy array is a view of the same memory, so it can not serve as the scratch buffer.
+
+    Examples:
+        >>> keys = memoryview(array('q', [3, 1, 2]))
+        >>> scratch = _copy(keys)
+        >>> scratch[0] = 7
+        >>> keys.tolist(), scratch.tolist()
+        ([3, 1, 2], [7, 1, 2])
+    """
+    if isinstance(keys, memoryview):
+        return memoryview(bytearray(keys)).cast(keys.format)
+    if type(keys).__module__ == "numpy":
+        return keys.copy()
+    return keys[:]
+
 
-    return list(_merge())
+def _sort_keys(keys, index: Optional[array]) -> None:
+    """Sort keys in place, moving the items of index alongside."""
+    _merge_sort(_copy(keys), keys, 0, len(keys), None if index is None else index[:], index)
 
 
-def merge_sort(arr: list) -> list:
+def merge_sort(arr: list, key: Optional[Callable] = None, reverse: bool = False,
+               inplace: bool = False) -> list:
     """
     Examples:
         >>> merge_sort([])
@@ -48,6 +163,8 @@ def merge_sort(arr: list) -> list:
         ['ad', 'an', 'g', 'mer', 'ze', 'zip']
         >>> merge_sort(['4', 'm', 'ye', 'da', '2', '17'])
         ['17', '2', '4', 'da', 'm', 'ye']
+        >>> merge_sort(['bb', 'a', 'ccc', 'dd', 'e'], key=len, reverse=True)
+        ['ccc', 'bb', 'dd', 'a', 'e']
         >>> import random
         >>> arr = random.sample(range(-500, 500), 1000)
         >>> merge_sort(arr) == sorted(arr)
@@ -56,11 +173,405 @@ def merge_sort(arr: list) -> list:
         >>> arr = random.choices(string.ascii_letters + string.digits, k=1000)
         >>> merge_sort(arr) == sorted(arr)
         True
+        >>> arr = [(random.randint(0, 9), i) for i in range(1000)]
+        >>> merge_sort(arr, key=lambda item: item[0]) == sorted(arr, key=lambda item: item[0])
+        True
+        >>> merge_sort(arr, key=lambda item: item[0], reverse=True) == sorted(
+        ...     arr, key=lambda item: item[0], reverse=True)
+        True
+        >>> values = array('d', [0.5, -1.0, 2.0])
+        >>> merge_sort(values, inplace=True) is values, values
+        (True, array('d', [-1.0, 0.5, 2.0]))
+        >>> arr = [(random.randint(0, 9), i) for i in range(1000)]
+        >>> expected = sorted(arr, key=lambda item: item[0], reverse=True)
+        >>> merge_sort(arr, key=lambda item: item[0], reverse=True, inplace=True) == expected
+        True
+        >>> data = array('q', [random.randint(0, 9) for _ in range(100)])
+        >>> expected, view = sorted(data, reverse=True), memoryview(data)
+        >>> merge_sort(view, reverse=True, inplace=True) is view, data.tolist() == expected
+        (True, True)
+        >>> try:
+        ...     import numpy
+        ... except ImportError:
+        ...     numpy = None
+        >>> data = numpy.random.randint(0, 50, 100) if numpy else array('q', range(100, 0, -1))
+        >>> expected = sorted(data.tolist())
+        >>> merge_sort(data, inplace=True).tolist() == expected
+        True
+        >>> merge_sort(data, reverse=True, inplace=True).tolist() == expected[::-1]
+        True
+    """
+    if inplace:
+        return sort_inplace(arr, _sort_keys, key, reverse)
+    # Ключи вычисляются один раз, элементы переставляются через массив номеров index.
+    keys, index = decorate(arr, key, reverse)
+    _sort_keys(keys, index)
+    return gather(arr, keys, index, reverse)
+
+
+def merge_argsort(arr, key: Optional[Callable] = None, reverse: bool = False):
+    """
+    Indices that stably sort arr, as an array('q') (or a NumPy array for NumPy input).
+
+    Examples:
+        >>> merge_argsort(['b', 'c', 'a', 'b'])
+        array('q', [2, 0, 3, 1])
+        >>> names, ages = ['bob', 'ann', 'cid', 'dan'], [30, 25, 35, 25]
+        >>> index = merge_argsort(ages, reverse=True)
+        >>> [names[i] for i in index], [ages[i] for i in index]
+        (['cid', 'bob', 'ann', 'dan'], [35, 30, 25, 25])
+        >>> import random
+        >>> arr = [random.randint(0, 99) for _ in range(1000)]
+        >>> list(merge_argsort(arr)) == sorted(range(1000), key=arr.__getitem__)
+        True
+    """
+    return argsort(arr, _sort_keys, key, reverse)
+
+
+def _min_run(n: int) -> int:
+    """
+    Examples:
+        >>> _min_run(63), _min_run(64), _min_run(65), _min_run(10 ** 6)
+        (63, 32, 33, 62)
+    """
+    extra = 0
+    while n >= 64:
+        extra |= n & 1
+        n >>= 1
+    return n + extra
+
+
+def _gallop(arr: list, x, lo: int, hi: int, right: bool) -> int:
+    """
+    Index of the first item of the sorted arr[lo:hi] greater than x (right=True) or not less than
+    x (right=False). Positions lo, lo+1, lo+3, lo+7, ... are checked first, so the search costs
+    O(log d) comparisons, where d is the distance from lo to the answer.
+    """
+    offset, last = 1, lo
+    while lo + offset - 1 < hi:
+        probe = arr[lo + offset - 1]
+        if (x < probe) if right else not (probe < x):
+            break
+        last = lo + offset
+        offset <<= 1
+    return (bisect_right if right else bisect_left)(arr, x, last, min(lo + offset - 1, hi))
+
+
+def _merge_runs(arr: list, lo: int, mid: int, hi: int, carry: Optional[list]) -> None:
+    # Элементы левой серии, не большие первого элемента правой, и элементы правой серии, не
+    # меньшие последнего элемента левой, уже стоят на своих местах.
+    lo = _gallop(arr, arr[mid], lo, mid, True)
+    hi = _gallop(arr, arr[mid - 1], mid, hi, False)
+    if lo == mid or mid == hi:
+        return
+    temp = arr[lo: mid]
+    temp_carry = carry[lo: mid] if carry is not None else None
+    size = mid - lo
+    i, j, k = 0, mid, lo
+    min_gallop = MIN_GALLOP
+    while i < size and j < hi:
+        # Поэлементное слияние, пока одна из серий не выиграет min_gallop раз подряд.
+        wins_left = wins_right = 0
+        while i < size and j < hi and wins_left < min_gallop and wins_right < min_gallop:
+            if arr[j] < temp[i]:
+                arr[k] = arr[j]
+                if carry is not None:
+                    carry[k] = carry[j]
+                j += 1
+                wins_left, wins_right = 0, wins_right + 1
+            else:
+                arr[k] = temp[i]
+                if carry is not None:
+                    carry[k] = temp_carry[i]
+                i += 1
+                wins_left, wins_right = wins_left + 1, 0
+            k += 1
+        # Режим галопа: целые куски серий переносятся срезами.
+        while i < size and j < hi:
+            end = _gallop(temp, arr[j], i, size, True)
+            count_left = end - i
+            arr[k: k + count_left] = temp[i: end]
+            if carry is not None:
+                carry[k: k + count_left] = temp_carry[i: end]
+            i, k = end, k + count_left
+            if i == size:
+                break
+            end = _gallop(arr, temp[i], j, hi, False)
+            count_right = end - j
+            arr[k: k + count_right] = arr[j: end]
+            if carry is not None:
+                carry[k: k + count_right] = carry[j: end]
+            j, k = end, k + count_right
+            if count_left < MIN_GALLOP and count_right < MIN_GALLOP:
+                min_gallop += 1
+                break
+            min_gallop = max(1, min_gallop - 1)
+    # Остаток правой серии уже на месте, остаток левой дописывается в конец.
+    arr[k: k + size - i] = temp[i:]
+    if carry is not None:
+        carry[k: k + size - i] = temp_carry[i:]
+
+
+def _natural_merge_sort(arr: list, carry: Optional[list] = None) -> None:
+    length = len(arr)
+    min_run = _min_run(length)
+    runs: List[List[int]] = []  # Стек серий [начало, длина].
+
+    def merge_at(n: int) -> None:
+        (base, size), (_, size_next) = runs[n], runs[n + 1]
+        _merge_runs(arr, base, base + size, base + size + size_next, carry)
+        runs[n][1] = size + size_next
+        del runs[n + 1]
+
+    lo = 0
+    while lo < length:
+        # Поиск естественной серии: неубывающей или строго убывающей (её переворачиваем).
+        hi = lo + 1
+        if hi < length and arr[hi] < arr[lo]:
+            hi += 1
+            while hi < length and arr[hi] < arr[hi - 1]:
+                hi += 1
+            arr[lo: hi] = arr[lo: hi][::-1]
+            if carry is not None:
+                carry[lo: hi] = carry[lo: hi][::-1]
+        elif hi < length:
+            hi += 1
+            while hi < length and not arr[hi] < arr[hi - 1]:
+                hi += 1
+        # Короткая серия дополняется до min_run вставками с двоичным поиском.
+        if hi - lo < min_run:
+            end = min(lo + min_run, length)
+            binary_insertion(arr, lo, hi, end, carry)
+            hi = end
+        runs.append([lo, hi - lo])
+        lo = hi
+
+        # Слияние серий на стеке, пока длины не убывают достаточно быстро.
+        while len(runs) > 1:
+            n = len(runs) - 2
+            if (n > 0 and runs[n - 1][1] <= runs[n][1] + runs[n + 1][1] or
+                    n > 1 and runs[n - 2][1] <= runs[n - 1][1] + runs[n][1]):
+                if runs[n - 1][1] < runs[n + 1][1]:
+                    n -= 1
+            elif runs[n][1] > runs[n + 1][1]:
+                break
+            merge_at(n)
+
+    while len(runs) > 1:
+        n = len(runs) - 2
+        if n > 0 and runs[n - 1][1] < runs[n + 1][1]:
+            n -= 1
+        merge_at(n)
+
+
+def natural_merge_sort(arr: list, key: Optional[Callable] = None, reverse: bool = False) -> list:
+    """
+    Idea:
+        Массив делится на естественные серии: уже неубывающие или строго убывающие (последние
+        переворачиваются) участки. Короткие серии дополняются до длины min_run сортировкой
+        вставками с двоичным поиском. Серии кладутся на стек и сливаются так, чтобы длины серий
+        на стеке убывали не медленнее чисел Фибоначчи, тогда сливаются серии близкой длины.
+        Если при слиянии одна серия долго выигрывает, слияние переходит в режим галопа:
+        экспоненциальным поиском находится, сколько её элементов подряд идут в результат,
+        и они переносятся одним срезом.
+
+    Examples:
+        >>> natural_merge_sort([])
+        []
+        >>> natural_merge_sort([0, 5, 3, 2, 2])
+        [0, 2, 2, 3, 5]
+        >>> natural_merge_sort(['an', 'zip', 'ad', 'mer', 'g', 'ze'])
+        ['ad', 'an', 'g', 'mer', 'ze', 'zip']
+        >>> natural_merge_sort(['bb', 'a', 'ccc', 'dd', 'e'], key=len, reverse=True)
+        ['ccc', 'bb', 'dd', 'a', 'e']
+        >>> import random
+        >>> arr = list(range(5000))
+        >>> for _ in range(50):
+        ...     i, j = random.randrange(5000), random.randrange(5000)
+        ...     arr[i], arr[j] = arr[j], arr[i]
+        >>> natural_merge_sort(arr) == sorted(arr)
+        True
+        >>> arr = [random.randint(0, 99) for _ in range(3000)] + list(range(3000, 0, -1))
+        >>> natural_merge_sort(arr) == sorted(arr)
+        True
+        >>> arr = [(random.randint(0, 9), i) for i in range(3000)]
+        >>> natural_merge_sort(arr, key=lambda item: item[0]) == sorted(arr, key=lambda item: item[0])
+        True
+        >>> class Counted(int):
+        ...     comparisons = 0
+        ...     def __lt__(self, other):
+        ...         Counted.comparisons += 1
+        ...         return int(self) < int(other)
+        >>> natural_merge_sort([Counted(i) for i in range(10000)]) == list(range(10000))
+        True
+        >>> Counted.comparisons
+        9999
     """
-    if len(arr) <= 1:
-        return arr
-    mid = len(arr) // 2
-    return merge(merge_sort(arr[:mid]), merge_sort(arr[mid:]))
+    keys, index = decorate(arr, key, reverse)
+    _natural_merge_sort(keys, index)
+    return gather(arr, keys, index, reverse)
+
+
+def benchmark(sizes=(10 ** 6, 10 ** 7)) -> None:
+    """Print the time of merge_sort and of the built-in sorted on random floats."""
+    import random
+    for size in sizes:
+        arr = [random.random() for _ in range(size)]
+        timings = []
+        for sort in (merge_sort, sorted):
+            start = perf_counter()
+            sort(arr)
+            timings.append(perf_counter() - start)
+        print(f"n = {size:>9}: merge_sort {timings[0]:7.2f} s, sorted {timings[1]:7.2f} s")
+
+
+def _sort_chunk(name: str, code: str, lo: int, hi: int) -> None:
+    memory = SharedMemory(name)
+    view = memory.buf.cast(code)
+    try:
+        view[lo: hi] = array(code, merge_sort(view[lo: hi].tolist()))
+    finally:
+        # Представление освобождается до close, иначе ошибка сменится на BufferError.
+        view.release()
+        memory.close()
+
+
+def _merge_partition(names: Tuple[str, str], code: str, pieces: List[Tuple[int, int]], offset: int) -> None:
+    memories = [SharedMemory(name) for name in names]
+    src, dst = views = [memory.buf.cast(code) for memory in memories]
+    try:
+        merged = array(code, heap_merge(*(src[lo: hi].tolist() for lo, hi in pieces)))
+        dst[offset: offset + len(merged)] = merged
+    finally:
+        for view in views:
+            view.release()
+        for memory in memories:
+            memory.close()
+
+
+def _co_rank(src, chunks: List[Tuple[int, int]], rank: int) -> List[int]:
+    """
+    Cut of every sorted chunk src[lo:hi] such that the items before the cuts are exactly the first
+    rank items of the stable merge of the chunks. Items equal across the cut are taken from the
+    earlier chunks first.
+
+    Examples:
+        >>> src = [0] * 9000 + list(range(1000))
+        >>> chunks = [(0, 2500), (2500, 5000), (5000, 7500), (7500, 10000)]
+        >>> src[7500:] = sorted(src[7500:])
+        >>> cuts = [[0, 2500, 5000, 7500]] + [_co_rank(src, chunks, r) for r in (2500, 5000, 7500)]
+        >>> cuts.append([2500, 5000, 7500, 10000])
+        >>> [sum(cuts[j + 1]) - sum(cuts[j]) for j in range(4)]
+        [2500, 2500, 2500, 2500]
+        >>> _co_rank([1, 3, 5, 2, 3, 4], [(0, 3), (3, 6)], 3)
+        [2, 4]
+    """
+    # Окно [low[c], high[c]) в c-й части, где лежит искомая граница; опорный элемент берётся
+    # из середины самого широкого окна, и окна сужаются, пока ранг не попадёт в серию равных ему.
+    low = [lo for lo, _ in chunks]
+    high = [hi for _, hi in chunks]
+    # Границы — абсолютные номера в src, поэтому ранг сравнивается с их суммой со сдвигом.
+    rank += sum(low)
+    while True:
+        c = max(range(len(chunks)), key=lambda d: high[d] - low[d])
+        if low[c] == high[c]:
+            return low
+        pivot = src[(low[c] + high[c]) // 2]
+        left = [bisect_left(src, pivot, lo, hi) for lo, hi in chunks]
+        right = [bisect_right(src, pivot, lo, hi) for lo, hi in chunks]
+        if rank < sum(left):
+            high = [min(h, cut) for h, cut in zip(high, left)]
+        elif rank > sum(right):
+            low = [max(l, cut) for l, cut in zip(low, right)]
+        else:
+            need = rank - sum(left)
+            for d in range(len(chunks)):
+                take = min(need, right[d] - left[d])
+                left[d] += take
+                need -= take
+            return left
+
+
+def parallel_merge_sort(arr: list, workers: Optional[int] = None) -> list:
+    """
+    Idea:
+        Массив копируется в разделяемую память и делится на workers частей, каждую из которых
+        сортирует свой процесс функцией merge_sort. Затем отсортированные части делятся на куски
+        по рангу в результате (функция _co_rank): j-е куски всех частей вместе содержат элементы
+        результата с номерами от n * j / workers до n * (j + 1) / workers. j-й процесс сливает
+        j-е куски и пишет их во второй буфер по смещению n * j / workers. Так слияние тоже
+        выполняется параллельно, и каждый процесс сливает около n / workers элементов, даже если
+        ключи повторяются.
+        Массивы не из чисел одного типа сортируются функцией merge_sort в текущем процессе.
+
+    Examples:
+        >>> import random
+        >>> arr = [random.randint(-1000, 1000) for _ in range(5000)]
+        >>> parallel_merge_sort(arr, workers=3) == merge_sort(arr)
+        True
+        >>> arr = [random.random() for _ in range(5000)]
+        >>> parallel_merge_sort(arr, workers=2) == merge_sort(arr)
+        True
+        >>> parallel_merge_sort([7] * 10 + [1], workers=2)
+        [1, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7]
+        >>> arr = [0] * 9000 + list(range(1000))
+        >>> parallel_merge_sort(arr, workers=4) == sorted(arr)
+        True
+        >>> parallel_merge_sort([1, 0.5, 2], workers=1)
+        [0.5, 1, 2]
+        >>> parallel_merge_sort(['b', 'a'], workers=2)
+        ['a', 'b']
+    """
+    workers = workers or os.cpu_count() or 1
+    code = typecode(arr)
+    length = len(arr)
+    if code is None or length < 2 * workers:
+        return merge_sort(arr)
+
+    data = array(code, arr)
+    memories = [SharedMemory(create=True, size=length * data.itemsize) for _ in range(2)]
+    src, dst = views = [memory.buf.cast(code) for memory in memories]
+    try:
+        src[:] = data
+        names = (memories[0].name, memories[1].name)
+        bounds = [length * i // workers for i in range(workers + 1)]
+        chunks = list(zip(bounds, bounds[1:]))
+        with ProcessPoolExecutor(workers) as executor:
+            for future in [executor.submit(_sort_chunk, names[0], code, lo, hi) for lo, hi in chunks]:
+                future.result()
+
+            # cuts[j][c] — граница в c-й части между (j - 1)-м и j-м кусками.
+            cuts = [[lo for lo, _ in chunks]] + [_co_rank(src, chunks, bound) for bound in bounds[1: -1]]
+            cuts.append([hi for _, hi in chunks])
+            futures = []
+            for j in range(workers):
+                pieces = list(zip(cuts[j], cuts[j + 1]))
+                futures.append(executor.submit(_merge_partition, names, code, pieces, bounds[j]))
+            for future in futures:
+                future.result()
+        result = dst.tolist()
+    finally:
+        for view in views:
+            view.release()
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+    return result
+
+
+def benchmark_parallel(size: int = 10 ** 7, max_workers: Optional[int] = None) -> None:
+    """Print the time and the speedup of parallel_merge_sort on random ints for 1..N workers."""
+    import random
+    arr = [random.getrandbits(62) for _ in range(size)]
+    start = perf_counter()
+    merge_sort(arr)
+    base = perf_counter() - start
+    print(f"{'merge_sort':>12}: {base:8.2f} s")
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        start = perf_counter()
+        parallel_merge_sort(arr, workers)
+        elapsed = perf_counter() - start
+        print(f"{workers:>4} workers: {elapsed:8.2f} s  x{base / elapsed:.2f}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+"""
+Non-comparison sorting backends for homogeneous numeric data and a dispatcher that chooses one.
+Counting sort. Time complexity: Θ(n + k), where k is the range of the values.
+LSD radix sort. Time complexity: Θ(w (n + 256)), where w is the number of bytes of a value.
+numeric_sort takes a list, an array.array or a NumPy array: integers of a small range go to the
+counting sort, other integers and floats to the radix sort, NumPy arrays to numpy.sort, and
+anything else (strings, mixed types) to the comparison merge_sort.
+Idea:
+    Числа хранятся в буфере array как 64-битные слова. Поразрядная сортировка рассматривает
+    слова как беззнаковые и проходит по их байтам от младшего к старшему. Байты одного разряда
+    всех чисел получаются одним срезом с шагом 8 из байтового представления буфера, поэтому
+    проход, в котором у всех чисел одинаковый байт, пропускается без просмотра элементов.
+    В остальных проходах числа устойчиво раскладываются по 256 корзинам. После сортировки
+    беззнаковых слов отрицательные числа (старший бит равен 1) оказываются в конце: у целых
+    в дополнительном коде они уже упорядочены и переносятся в начало, у чисел с плавающей точкой
+    упорядочены по возрастанию модуля и переносятся в начало в обратном порядке.
+"""
+from typing import Optional
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from math import copysign, isnan
+from time import perf_counter
+import sys
+
+from merge_sort import merge_sort
+from sort_by_key import typecode
+
+
+SIGN = 1 << 63
+INTEGER_CODES = "bBhHiIlLqQ"
+
+
+def counting_sort(arr, code: str = "q") -> array:
+    """
+    Examples:
+        >>> counting_sort([3, -1, 2, 3, 0, -1]).tolist()
+        [-1, -1, 0, 2, 3, 3]
+        >>> counting_sort([]).tolist()
+        []
+    """
+    result = array(code)
+    if not len(arr):
+        return result
+    counts = Counter(arr)
+    for value in range(min(counts), max(counts) + 1):
+        count = counts.get(value)
+        if count:
+            result += array(code, [value]) * count
+    return result
+
+
+def _radix_sort_unsigned(keys: array) -> array:
+    """Stable LSD radix sort of an array('Q') by bytes."""
+    width = keys.itemsize
+    length = len(keys)
+    for byte in range(width):
+        raw = keys.tobytes()
+        start = byte if sys.byteorder == "little" else width - 1 - byte
+        digits = raw[start::width]
+        if digits.count(digits[0]) == length:
+            continue
+        buckets = [array("Q") for _ in range(256)]
+        appends = [bucket.append for bucket in buckets]
+        for digit, key in zip(digits, keys):
+            appends[digit](key)
+        keys = array("Q")
+        for bucket in buckets:
+            keys += bucket
+    return keys
+
+
+def radix_sort(arr, code: str = "q") -> array:
+    """
+    Sort numbers of the array type code 'q' (signed 64-bit integers), 'Q' (unsigned) or 'd'
+    (floats without NaN) and return an array of that type. Floats are ordered by their bits, so
+    -0.0 comes before 0.0.
+
+    Examples:
+        >>> radix_sort([3, -1, 2 ** 40, -2 ** 62, 0]).tolist()
+        [-4611686018427387904, -1, 0, 3, 1099511627776]
+        >>> radix_sort([2.5, -0.5, -3.0, 1e-300, 0.0], "d").tolist()
+        [-3.0, -0.5, 0.0, 1e-300, 2.5]
+        >>> radix_sort([2 ** 64 - 1, 5], "Q").tolist()
+        [5, 18446744073709551615]
+        >>> import random
+        >>> arr = [random.randint(-2 ** 63, 2 ** 63 - 1) for _ in range(1000)]
+        >>> radix_sort(arr).tolist() == sorted(arr)
+        True
+        >>> arr = [random.uniform(-1e9, 1e9) for _ in range(1000)]
+        >>> radix_sort(arr, "d").tolist() == sorted(arr)
+        True
+    """
+    values = arr if isinstance(arr, array) and arr.typecode == code else array(code, arr)
+    keys = _radix_sort_unsigned(array("Q", values.tobytes()))
+    if code == "Q":
+        return keys
+    # Отрицательные числа — слова со старшим битом, равным 1, — стоят в конце.
+    split = bisect_left(keys, SIGN)
+    negative = keys[split:]
+    if code == "d":
+        negative.reverse()
+    return array(code, (negative + keys[:split]).tobytes())
+
+
+def numeric_sort(arr):
+    """
+    Examples:
+        >>> numeric_sort([5, 3, 5, -1])
+        [-1, 3, 5, 5]
+        >>> numeric_sort([0.5, -2.0, 1.5])
+        [-2.0, 0.5, 1.5]
+        >>> numeric_sort(array("h", [300, -7, 12]))
+        array('h', [-7, 12, 300])
+        >>> numeric_sort(array("L", [2 ** 32 - 1, 1])), numeric_sort(array("Q", [2 ** 63, 1]))
+        (array('L', [1, 4294967295]), array('Q', [1, 9223372036854775808]))
+        >>> numeric_sort(array("f", [0.5, -0.25]))
+        array('f', [-0.25, 0.5])
+        >>> numeric_sort(['b', 'a', 'c'])
+        ['a', 'b', 'c']
+        >>> numeric_sort([1, 2.5, 0])
+        [0, 1, 2.5]
+        >>> arr = [2.0, float("nan"), 1.0]
+        >>> str(numeric_sort(arr)) == str(merge_sort(arr))
+        True
+        >>> numeric_sort([0.0, -0.0, 1.0]), numeric_sort(array("d", [-0.0, 0.0]))
+        ([0.0, -0.0, 1.0], array('d', [-0.0, 0.0]))
+    """
+    if type(arr).__module__ == "numpy":
+        import numpy
+        return numpy.sort(arr, kind="stable")
+    if isinstance(arr, array):
+        code = _backend(arr, arr.typecode)
+        if code is None:
+            return array(arr.typecode, merge_sort(arr.tolist()))
+        return array(arr.typecode, _sort(arr, code))
+    code = _backend(arr, typecode(arr))
+    if code is None:
+        return merge_sort(arr)
+    return _sort(arr, code).tolist()
+
+
+def _backend(arr, code: Optional[str]) -> Optional[str]:
+    """Buffer type code to sort arr with, or None if it needs the comparison sort."""
+    if code is None or not len(arr):
+        return None
+    if code in INTEGER_CODES:
+        # Беззнаковые 64-битные числа ('L' на LP64, 'Q') не помещаются в 'q'.
+        return "Q" if code.isupper() and array(code).itemsize == 8 else "q"
+    # Поразрядная сортировка ставит -0.0 перед 0.0, а сравнения считают их равными и сохраняют
+    # исходный порядок, поэтому такие массивы, как и массивы с NaN, сортируются сравнениями.
+    if code in "fd" and not any(isnan(value) or value == 0 and copysign(1, value) < 0 for value in arr):
+        return "d"
+    return None
+
+
+def _sort(arr, code: str) -> array:
+    if code == "d":
+        return radix_sort(arr, code)
+    low, high = min(arr), max(arr)
+    if high - low <= max(256, 2 * len(arr)):
+        return counting_sort(arr, code)
+    return radix_sort(arr, code)
+
+
+def benchmark(sizes=(10 ** 4, 10 ** 5, 10 ** 6)) -> None:
+    """Print a table of the time of numeric_sort, merge_sort and sorted per data type and size."""
+    import random
+    generators = {
+        "int64": lambda: random.randint(-2 ** 63, 2 ** 63 - 1),
+        "int32": lambda: random.randint(-2 ** 31, 2 ** 31 - 1),
+        "int8": lambda: random.randint(-128, 127),
+        "float64": random.random,
+    }
+    print(f"{'dtype':>8} {'n':>9} {'numeric_sort':>13} {'merge_sort':>11} {'sorted':>8}")
+    for name, generate in generators.items():
+        for size in sizes:
+            arr = [generate() for _ in range(size)]
+            timings = []
+            for sort in (numeric_sort, merge_sort, sorted):
+                start = perf_counter()
+                sort(arr)
+                timings.append(perf_counter() - start)
+            print(f"{name:>8} {size:>9} {timings[0]:13.3f} {timings[1]:11.3f} {timings[2]:8.3f}")
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
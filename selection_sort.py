@@ -8,10 +8,22 @@ Idea:
     путём нахождения наименьшего элемента в несортированном части массива, перестановки его с
     крайним левым несортированным элементом (помещая его в отсортированном порядке) и перемещения
     границы отсортированного подсписка на один элемент вправо.
+    Чтобы сортировка была устойчивой, наименьший элемент (первый из равных) не меняется местами
+    с крайним левым, а вставляется перед ним: участок между ними сдвигается на одну позицию вправо.
+The same idea of selecting the least items gives a selection engine that does not sort everything:
+nth_element and partial_sort in Θ(n) (introselect with a median of medians fallback) and
+nsmallest/nlargest in Θ(n + k log k) for sequences or Θ(n log k) time and Θ(k) memory for streams.
 """
+from typing import Callable, Iterable, Optional, Tuple
+from array import array
+from collections.abc import Sequence
 
+from insertion_sort import binary_insertion
+from merge_sort import merge_argsort, merge_sort
+from sort_by_key import decorate, gather, reorder, sort_inplace
 
-def selection_sort(arr: list) -> list:
+
+def selection_sort(arr: list, key: Optional[Callable] = None, reverse: bool = False) -> list:
     """
     Examples:
         >>> selection_sort([])
@@ -32,13 +44,292 @@ def selection_sort(arr: list) -> list:
         >>> arr = random.choices(string.ascii_letters + string.digits, k=100)
         >>> selection_sort(arr) == sorted(arr)
         True
+        >>> selection_sort(['bb', 'a', 'ccc', 'dd', 'e'], key=len, reverse=True)
+        ['ccc', 'bb', 'dd', 'a', 'e']
+        >>> arr = [(random.randint(0, 9), i) for i in range(100)]
+        >>> selection_sort(arr, key=lambda item: item[0]) == sorted(arr, key=lambda item: item[0])
+        True
     """
-    arr = arr.copy()
-    length = len(arr)
+    keys, index = decorate(arr, key, reverse)
+    length = len(keys)
     for pos in range(length - 1):
-        least = min(range(pos, length), key=arr.__getitem__)
-        arr[pos], arr[least] = arr[least], arr[pos]
-    return arr
+        least = min(range(pos, length), key=keys.__getitem__)
+        if least == pos:
+            continue
+        keys[pos: least + 1] = keys[least: least + 1] + keys[pos: least]
+        if index is not None:
+            index[pos: least + 1] = index[least: least + 1] + index[pos: least]
+    return gather(arr, keys, index, reverse)
+
+
+def _swap(arr, carry: Optional[array], i: int, j: int) -> None:
+    arr[i], arr[j] = arr[j], arr[i]
+    if carry is not None:
+        carry[i], carry[j] = carry[j], carry[i]
+
+
+def _partition(arr, lo: int, hi: int, pivot, carry: Optional[array]) -> Tuple[int, int]:
+    """
+    Three-way partition of arr[lo:hi] around the value pivot. Return lt, gt such that
+    arr[lo:lt] < pivot, arr[lt:gt] == pivot and arr[gt:hi] > pivot.
+    """
+    lt, i, gt = lo, lo, hi
+    while i < gt:
+        value = arr[i]
+        if value < pivot:
+            _swap(arr, carry, lt, i)
+            lt += 1
+            i += 1
+        elif pivot < value:
+            gt -= 1
+            _swap(arr, carry, i, gt)
+        else:
+            i += 1
+    return lt, gt
+
+
+def _median_of_medians(arr, lo: int, hi: int, carry: Optional[array]):
+    """Pivot value of arr[lo:hi] that has at least ~3/10 of the items on each side."""
+    # Медианы групп по 5 элементов переносятся в начало отрезка, и среди них рекурсивно
+    # выбирается медиана.
+    store = lo
+    for start in range(lo, hi, 5):
+        end = min(start + 5, hi)
+        binary_insertion(arr, start, start + 1, end, carry)
+        _swap(arr, carry, store, (start + end - 1) // 2)
+        store += 1
+    middle = (lo + store - 1) // 2
+    _select(arr, lo, store, middle, carry)
+    return arr[middle]
+
+
+def _select(arr, lo: int, hi: int, k: int, carry: Optional[array] = None) -> None:
+    """
+    Rearrange arr[lo:hi] so that arr[k] is the item that a sort would put there, no item of
+    arr[lo:k] is greater and no item of arr[k+1:hi] is less. carry items move alongside.
+    """
+    # Опорный элемент — медиана трёх. Если отрезок слишком часто уменьшается меньше чем
+    # вдвое, опорным становится медиана медиан, и время остаётся линейным.
+    budget = (hi - lo).bit_length()
+    while hi - lo > 1:
+        size = hi - lo
+        if budget > 0:
+            pivot = sorted((arr[lo], arr[(lo + hi) // 2], arr[hi - 1]))[1]
+        else:
+            pivot = _median_of_medians(arr, lo, hi, carry)
+        lt, gt = _partition(arr, lo, hi, pivot, carry)
+        if k < lt:
+            hi = lt
+        elif k >= gt:
+            lo = gt
+        else:
+            return
+        if 2 * (hi - lo) > size:
+            budget -= 1
+
+
+def nth_element(arr, k: int, key: Optional[Callable] = None, inplace: bool = False) -> list:
+    """
+    Rearrange the items so that the k-th one (from 0) is the item that would be there after
+    sorting, the items before it are not greater and the items after it are not less.
+
+    Idea:
+        Как в сортировке выбором, ищется элемент, который должен стоять на позиции k, но без
+        сортировки остальных: массив разбивается на три части — меньше опорного, равные ему и
+        больше, — и поиск продолжается только в той части, где находится позиция k.
+
+    Examples:
+        >>> nth_element([5, 1, 4, 2, 3], 2)[2]
+        3
+        >>> nth_element(['bb', 'a', 'dddd', 'ccc'], 3, key=len)[3]
+        'dddd'
+        >>> nth_element([1], 1)
+        Traceback (most recent call last):
+            ...
+        IndexError: k out of range
+        >>> import random
+        >>> arr = [random.randint(0, 99) for _ in range(1000)]
+        >>> result = nth_element(arr, 500)
+        >>> result[500] == sorted(arr)[500], max(result[:500]) <= result[500] <= min(result[501:])
+        (True, True)
+        >>> killer = list(range(0, 2000, 2)) + list(range(1, 2000, 2))
+        >>> nth_element(killer, 1500, inplace=True) is killer, killer[1500]
+        (True, 1500)
+    """
+    if not 0 <= k < len(arr):
+        raise IndexError("k out of range")
+
+    def select(keys, index: Optional[array]) -> None:
+        _select(keys, 0, len(keys), k, index)
+
+    if inplace:
+        return sort_inplace(arr, select, key)
+    keys, index = decorate(arr, key)
+    select(keys, index)
+    return gather(arr, keys, index)
+
+
+def partial_sort(arr, k: int, key: Optional[Callable] = None, inplace: bool = False) -> list:
+    """
+    Put the k least items in sorted order at the start; the rest follow in no particular order.
+    Unlike the sorts, equal items may change their order.
+
+    Examples:
+        >>> partial_sort([5, 1, 4, 2, 3], 3)[:3]
+        [1, 2, 3]
+        >>> partial_sort(['bb', 'a', 'dddd', 'ccc'], 2, key=len)[:2]
+        ['a', 'bb']
+        >>> import random
+        >>> arr = [random.random() for _ in range(1000)]
+        >>> result = partial_sort(arr, 10)
+        >>> result[:10] == sorted(arr)[:10], sorted(result) == sorted(arr)
+        (True, True)
+    """
+    k = min(max(k, 0), len(arr))
+
+    def select(keys, index: Optional[array]) -> None:
+        if not k:
+            return
+        _select(keys, 0, len(keys), k - 1, index)
+        order = merge_argsort(keys[:k])
+        for column in (keys, index):
+            if column is not None:
+                head = column[:k]
+                reorder(head, order)
+                column[:k] = head
+
+    if inplace:
+        return sort_inplace(arr, select, key)
+    keys, index = decorate(arr, key)
+    select(keys, index)
+    return gather(arr, keys, index)
+
+
+def _sift_up(heap: list, pos: int, above: Callable) -> None:
+    entry = heap[pos]
+    while pos:
+        parent = (pos - 1) // 2
+        if not above(entry, heap[parent]):
+            break
+        heap[pos] = heap[parent]
+        pos = parent
+    heap[pos] = entry
+
+
+def _sift_down(heap: list, pos: int, above: Callable) -> None:
+    entry, length = heap[pos], len(heap)
+    while 2 * pos + 1 < length:
+        child = 2 * pos + 1
+        if child + 1 < length and above(heap[child + 1], heap[child]):
+            child += 1
+        if not above(heap[child], entry):
+            break
+        heap[pos] = heap[child]
+        pos = child
+    heap[pos] = entry
+
+
+def _heap_select(k: int, iterable: Iterable, key: Optional[Callable], largest: bool) -> list:
+    """The k least (or greatest) items of a stream, kept in a heap of at most k entries."""
+    # В корне кучи — запись (ключ, номер, элемент), которая первой покинет ответ. Номер
+    # различает равные ключи, так что сами элементы никогда не сравниваются.
+    if largest:
+        def above(a, b):
+            return a[0] < b[0] or not b[0] < a[0] and a[1] > b[1]
+    else:
+        def above(a, b):
+            return b[0] < a[0] or not a[0] < b[0] and a[1] > b[1]
+    heap: list = []
+    for order, item in enumerate(iterable):
+        value = item if key is None else key(item)
+        if len(heap) < k:
+            heap.append((value, order, item))
+            _sift_up(heap, len(heap) - 1, above)
+        elif (heap[0][0] < value) if largest else (value < heap[0][0]):
+            heap[0] = (value, order, item)
+            _sift_down(heap, 0, above)
+    # Записи упорядочиваются по номеру, а затем устойчиво по ключу.
+    heap = merge_sort(heap, key=lambda entry: entry[1])
+    return [item for _, _, item in merge_sort(heap, key=lambda entry: entry[0], reverse=largest)]
+
+
+def _sequence_select(k: int, arr: Sequence, key: Optional[Callable], largest: bool) -> list:
+    """The k least (or greatest) items of a sequence: selection of the boundary key and one pass."""
+    keys, _ = decorate(arr, key)
+    length = len(keys)
+    work = keys[:]
+    pos = length - k if largest else k - 1
+    _select(work, 0, length, pos)
+    bound = work[pos]
+    # Сколько элементов, равных границе, войдёт в ответ: первые по порядку, как в устойчивой
+    # сортировке.
+    strict = sum(1 for value in (work[pos:] if largest else work[:pos + 1])
+                 if (bound < value if largest else value < bound))
+    equal = k - strict
+    del work
+    taken = []
+    for item, value in zip(arr, keys):
+        if (bound < value) if largest else (value < bound):
+            taken.append(item)
+        elif equal and not (value < bound or bound < value):
+            taken.append(item)
+            equal -= 1
+    return merge_sort(taken, key=key, reverse=largest)
+
+
+def nsmallest(k: int, iterable: Iterable, key: Optional[Callable] = None) -> list:
+    """
+    The k least items in sorted order, equal items in the order of the input, as in
+    sorted(iterable, key=key)[:k]. A sequence is handled by selection in Θ(n + k log k) time,
+    any other iterable by a bounded heap in Θ(n log k) time and Θ(k) memory.
+
+    Examples:
+        >>> nsmallest(3, [5, 1, 4, 1, 3])
+        [1, 1, 3]
+        >>> nsmallest(2, (word for word in ['bb', 'a', 'c', 'dd']), key=len)
+        ['a', 'c']
+        >>> nsmallest(0, [1]), nsmallest(5, iter([2, 1]))
+        ([], [1, 2])
+        >>> import random
+        >>> arr = [(random.randint(0, 9), i) for i in range(1000)]
+        >>> first = lambda item: item[0]
+        >>> expected = sorted(arr, key=first)[:100]
+        >>> nsmallest(100, arr, first) == nsmallest(100, iter(arr), first) == expected
+        True
+    """
+    if k <= 0:
+        return []
+    if isinstance(iterable, Sequence):
+        if k >= len(iterable):
+            return merge_sort(iterable, key=key)
+        return _sequence_select(k, iterable, key, False)
+    return _heap_select(k, iterable, key, False)
+
+
+def nlargest(k: int, iterable: Iterable, key: Optional[Callable] = None) -> list:
+    """
+    The k greatest items in descending order, equal items in the order of the input, as in
+    sorted(iterable, key=key, reverse=True)[:k].
+
+    Examples:
+        >>> nlargest(3, [5, 1, 4, 1, 5])
+        [5, 5, 4]
+        >>> nlargest(2, iter(['bb', 'a', 'c', 'dd']), key=len)
+        ['bb', 'dd']
+        >>> import random
+        >>> arr = [(random.randint(0, 9), i) for i in range(1000)]
+        >>> first = lambda item: item[0]
+        >>> expected = sorted(arr, key=first, reverse=True)[:100]
+        >>> nlargest(100, arr, first) == nlargest(100, iter(arr), first) == expected
+        True
+    """
+    if k <= 0:
+        return []
+    if isinstance(iterable, Sequence):
+        if k >= len(iterable):
+            return merge_sort(iterable, key=key, reverse=True)
+        return _sequence_select(k, iterable, key, True)
+    return _heap_select(k, iterable, key, True)
 
 
 if __name__ == "__main__":
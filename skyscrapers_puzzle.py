@@ -8,14 +8,149 @@ In a grid of size by size you want to place a skyscraper in each square with onl
 It returns a size×size array with the proper answer for the puzzle. Or it returns None in cases of:
     1. Invalid view (not 9x9; values not in the range 1~9);
     2. Multiple solutions for the same puzzle or the puzzle is unsolvable.
+The permutations of a line and their index by clues are built once per size and kept in an LRU
+cache (line_table); they can also be stored on disk and memory-mapped between runs.
 """
 from typing import List, Tuple, Optional
-from itertools import permutations, product
+from itertools import permutations
+from functools import lru_cache
+from collections import deque
+from array import array
+import mmap
+import os
 
 
 Matrix = List[List[int]]
 
 
+class LineTable:
+    """
+    All permutations of heights 1..size of one line, stored as a flat byte buffer (a line is a
+    bytes slice, line[j] is the height of the j-th skyscraper), and the ids of the permutations
+    for every pair of clues (left, right), where the clue 0 matches any view.
+
+    Examples:
+        >>> table = LineTable.build(3)
+        >>> [list(table.line(k)) for k in table.ids(2, 0)]
+        [[1, 3, 2], [2, 1, 3], [2, 3, 1]]
+        >>> [list(table.line(k)) for k in table.ids(2, 2)]
+        [[1, 3, 2], [2, 3, 1]]
+        >>> len(table.ids(0, 0)), len(table.ids(3, 3))
+        (6, 0)
+    """
+
+    def __init__(self, size: int, lines, offsets, ids):
+        self.size = size
+        self.lines = lines
+        self.offsets = offsets
+        self._ids = ids
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.lines) // self.size if self.size else 1
+
+    def line(self, k: int) -> bytes:
+        return bytes(self.lines[k * self.size: (k + 1) * self.size])
+
+    def ids(self, left: int, right: int):
+        key = left * (self.size + 1) + right
+        return self._ids[self.offsets[key]: self.offsets[key + 1]]
+
+    def bitset(self, left: int, right: int) -> int:
+        """
+        Examples:
+            >>> bin(LineTable.build(3).bitset(2, 0))
+            '0b1110'
+        """
+        bits = bytearray((len(self) + 7) // 8)
+        for k in self.ids(left, right):
+            bits[k >> 3] |= 1 << (k & 7)
+        return int.from_bytes(bits, "little")
+
+    def positions(self) -> List[List[int]]:
+        """
+        positions()[p][h] is the bitset of the permutations with the height h at the position p.
+
+        Examples:
+            >>> [bin(mask) for mask in LineTable.build(3).positions()[0]]
+            ['0b0', '0b11', '0b1100', '0b110000']
+        """
+        if self._positions is None:
+            size = self.size
+            masks = [[bytearray((len(self) + 7) // 8) for _ in range(size + 1)] for _ in range(size)]
+            for k in range(len(self) if size else 0):
+                byte, bit = k >> 3, 1 << (k & 7)
+                for p, height in enumerate(self.lines[k * size: (k + 1) * size]):
+                    masks[p][height][byte] |= bit
+            self._positions = [[int.from_bytes(mask, "little") for mask in row] for row in masks]
+        return self._positions
+
+    @classmethod
+    def build(cls, size: int) -> "LineTable":
+        groups = [array("I") for _ in range((size + 1) ** 2)]
+        lines = bytearray()
+        for k, variant in enumerate(permutations(range(1, size + 1))):
+            lines.extend(variant)
+            left, right = vision(variant), vision(variant[::-1])
+            for key in {left * (size + 1) + right, right, left * (size + 1), 0}:
+                groups[key].append(k)
+        offsets, ids = array("I", [0]), array("I")
+        for group in groups:
+            ids.extend(group)
+            offsets.append(len(ids))
+        return cls(size, bytes(lines), offsets, ids)
+
+    def dump(self, path: str) -> None:
+        # Заголовок (size, длина буфера линий), линии (с выравниванием до 4 байт), смещения, id.
+        padding = -len(self.lines) % 4
+        with open(path, "wb") as file:
+            file.write(array("I", [self.size, len(self.lines)]).tobytes())
+            file.write(bytes(self.lines) + bytes(padding))
+            file.write(array("I", self.offsets).tobytes())
+            file.write(array("I", self._ids).tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "LineTable":
+        with open(path, "rb") as file:
+            buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        size, length = buffer[:8].cast("I")
+        start = 8 + length + (-length % 4)
+        end = start + 4 * ((size + 1) ** 2 + 1)
+        return cls(size, buffer[8: 8 + length], buffer[start: end].cast("I"), buffer[end:].cast("I"))
+
+
+def vision(line) -> int:
+    """
+    Examples:
+        >>> vision((1, 3, 2, 4))
+        3
+        >>> vision((4, 3, 2, 1))
+        1
+    """
+    maximum = count = 0
+    for dig in line:
+        if dig > maximum:
+            maximum = dig
+            count += 1
+    return count
+
+
+@lru_cache(maxsize=8)
+def line_table(size: int, store: Optional[str] = None) -> LineTable:
+    """
+    Return the line table of the given size. With a store directory the table is written there
+    on the first use and memory-mapped from the file afterwards.
+    """
+    if store is None:
+        return LineTable.build(size)
+    path = os.path.join(store, f"skyscrapers_{size}.bin")
+    if not os.path.exists(path):
+        temp = f"{path}.{os.getpid()}.tmp"
+        LineTable.build(size).dump(temp)
+        os.replace(temp, path)
+    return LineTable.load(path)
+
+
 def check(view: Tuple[int], size: int) -> bool:
     if len(view) != 4 * size:
         return False
@@ -25,51 +160,102 @@ def check(view: Tuple[int], size: int) -> bool:
     return True
 
 
-def solve(view: Tuple[int], size: int) -> Optional[Matrix]:
-    rg0, rg1 = range(size), range(1, size + 1)
-    # Словарь всех возможных перестановок размеров небоскрёбов для каждого видения.
-    variants = {key: set() for key in range(size + 1)}
-    for variant in permutations(rg1):
-        maximum = vision = 0
-        for dig in variant:
-            if dig > maximum:
-                maximum = dig
-                vision += 1
-        variants[0].add(variant)
-        variants[vision].add(variant)
-
-    # Фильтрация по подсказкам. Горизонтальное (hor) и вертикальное (ver) представления пазла.
-    hor = [variants[r] & {variant[::-1] for variant in variants[l]}
-           for (r, l) in zip(view[4*size - 1: 3*size - 1: -1], view[size: 2*size])]
-    ver = [variants[t] & {variant[::-1] for variant in variants[b]}
-           for (t, b) in zip(view[0: size], view[3*size - 1: 2*size - 1: -1])]
+def members(bits: int) -> List[int]:
+    """
+    Examples:
+        >>> members(0b101100)
+        [2, 3, 5]
+        >>> members(0)
+        []
+    """
+    return [k for k, bit in enumerate(bin(bits)[:1:-1]) if bit == "1"]
+
+
+def propagate(table: LineTable, lines: List[int], queue: deque) -> bool:
+    """
+    Idea:
+        Линия из очереди передаёт пересекающим её линиям, какие высоты возможны в общих клетках:
+        у пересекающей линии остаются только варианты с этими высотами. Изменившиеся линии снова
+        встают в очередь, так что пересматриваются только линии, затронутые с прошлого прохода.
+        Возвращает False, если у какой-то линии не осталось вариантов.
+    """
+    size, positions = table.size, table.positions()
+    queued = [False] * (2 * size)
+    for a in queue:
+        queued[a] = True
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        # Пересекающиеся линии: клетка a-й линии с номером p лежит в линии b на позиции pb.
+        first, pb = (size, a) if a < size else (0, a - size)
+        for p in range(size):
+            b = first + p
+            mask = 0
+            for height in range(1, size + 1):
+                if lines[a] & positions[p][height]:
+                    mask |= positions[pb][height]
+            narrowed = lines[b] & mask
+            if not narrowed:
+                return False
+            if narrowed != lines[b]:
+                lines[b] = narrowed
+                if not queued[b]:
+                    queue.append(b)
+                    queued[b] = True
+    return True
+
+
+def solve(view: Tuple[int], size: int, store: Optional[str] = None) -> Optional[Matrix]:
+    # Все перестановки размеров небоскрёбов, сгруппированные по паре подсказок (слева, справа).
+    table = line_table(size, store)
+
+    # Фильтрация по подсказкам. Варианты каждой линии хранятся как битовое множество номеров
+    # перестановок: сначала size строк (горизонтальное представление), затем size столбцов.
+    lines = ([table.bitset(l, r)
+              for (l, r) in zip(view[4*size - 1: 3*size - 1: -1], view[size: 2*size])] +
+             [table.bitset(t, b)
+              for (t, b) in zip(view[0: size], view[3*size - 1: 2*size - 1: -1])])
 
     # Фильтрация по совместимости строк и колонн.
-    check = 0  # Общее количество вариантов линий горизонтального и вертикального представлений.
-    memory = -1  # Значение check на предыдущей итерации цикла.
-
-    # check = 2*size <—> в обоих представлениях осталось по одному варианту на каждую линию.
-    # check = memory <—> не было и более не будет отфильтровано ни одного варианта.
-    while check != 2*size and check != memory:
-        for i, j in product(rg0, rg0):
-            common = {line[j] for line in hor[i]} & {line[i] for line in ver[j]}
-            hor[i] = [line for line in hor[i] if line[j] in common]
-            ver[j] = [line for line in ver[j] if line[i] in common]
-        memory, check = check, sum(len(line_variants) for line_variants in hor + ver)
-
-    # Перебор оставшихся вариантов.
-    valid = {*rg1}
-    success = None
-    for puzzle_variant in product(*hor):
-        # Если каждый столбец представляет собой множество чисел от 1 до size включительно.
-        if all({puzzle_variant[i][j] for i in rg0} == valid for j in rg0):
-            if success:  # Если вариантов решения пазла множество.
+    if not propagate(table, lines, deque(range(2 * size))):
+        return
+
+    # Перебор оставшихся вариантов строк с возвратом.
+    solutions = []
+    backtrack(table, lines, solutions)
+    if len(solutions) != 1:  # Если вариантов решения пазла множество или нет ни одного.
+        return
+    return solutions[0]
+
+
+def backtrack(table: LineTable, lines: List[int], solutions: List[Matrix]) -> None:
+    """
+    Idea:
+        Выбираем строку с наименьшим числом оставшихся вариантов (но больше одного) и перебираем
+        её варианты. Выбранный вариант распространяется на столбцы и остальные строки функцией
+        propagate, так что противоречия обнаруживаются сразу. Когда у каждой строки остаётся один
+        вариант, пазл решён. Перебор прекращается после второго решения.
+    """
+    size = table.size
+    best = None
+    for i, bits in enumerate(lines[:size]):
+        count = bits.bit_count()
+        if count > 1 and (best is None or count < lines[best].bit_count()):
+            best = i
+
+    if best is None:
+        solutions.append([list(table.line(bits.bit_length() - 1)) for bits in lines[:size]])
+        return
+    for k in members(lines[best]):
+        attempt = lines.copy()
+        attempt[best] = 1 << k
+        if propagate(table, attempt, deque([best])):
+            backtrack(table, attempt, solutions)
+            if len(solutions) > 1:
                 return
-            success = list(list(row) for row in puzzle_variant)
-    return success
 
 
-def skyscrapers_puzzle(view: Tuple[int], size: int) -> Optional[Matrix]:
+def skyscrapers_puzzle(view: Tuple[int], size: int, store: Optional[str] = None) -> Optional[Matrix]:
     """
     Examples:
         >>> skyscrapers_puzzle((2, 2, 1, 3,  2, 2, 3, 1,  1, 2, 2, 3,  3, 2, 1, 3), 5)
@@ -108,10 +294,17 @@ def skyscrapers_puzzle(view: Tuple[int], size: int) -> Optional[Matrix]:
         ...                     0, 4, 2, 0, 0, 0, 6,  0, 0, 0, 0, 0, 0, 0), 7)  # doctest: +NORMALIZE_WHITESPACE
         [[7, 6, 2, 1, 5, 4, 3], [1, 3, 5, 4, 2, 7, 6], [6, 5, 4, 7, 3, 2, 1], [5, 1, 7, 6, 4, 3, 2],
          [4, 2, 1, 3, 7, 6, 5], [3, 7, 6, 2, 1, 5, 4], [2, 4, 3, 5, 6, 1, 7]] 
+
+        >>> import tempfile
+        >>> with tempfile.TemporaryDirectory() as store:
+        ...     for _ in range(2):
+        ...         print(skyscrapers_puzzle((3, 1, 2,  2, 1, 3,  2, 2, 1,  1, 2, 2), 3, store))
+        [[1, 3, 2], [2, 1, 3], [3, 2, 1]]
+        [[1, 3, 2], [2, 1, 3], [3, 2, 1]]
     """
     if not check(view, size):
         return
-    return solve(view, size)
+    return solve(view, size, store)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""
+Helpers for sorting by key with the decorate-once scheme shared by the sorts of this repository.
+Idea:
+    Ключ каждого элемента вычисляется ровно один раз и хранится в параллельном массиве keys
+    (если все ключи — числа одного типа, то в компактном array). Рядом хранится массив index
+    номеров элементов. Сортировка переставляет keys и index одновременно, сравнивая только ключи,
+    а в конце элементы собираются по index. Кортежи (ключ, элемент) не создаются. Для устойчивой
+    сортировки по убыванию элементы берутся в обратном порядке, сортируются по возрастанию, и
+    результат переворачивается: равные элементы дважды меняют порядок и остаются в исходном.
+    Сортировка на месте переставляет элементы исходного массива по отсортированному index,
+    обходя циклы перестановки, а argsort возвращает сам index, не трогая данные.
+"""
+from typing import Callable, Optional, Tuple
+from array import array
+
+
+def typecode(arr) -> Optional[str]:
+    """
+    Type code of the array module that holds every item of arr exactly: 'q' for ints that fit
+    in 64 bits, 'd' for floats. None for any other or mixed items.
+
+    Examples:
+        >>> typecode([1, -2, 3]), typecode([0.5, 1.0]), typecode([1, 0.5]), typecode([2 ** 63])
+        ('q', 'd', None, None)
+        >>> typecode(['a']), typecode([True]), typecode([])
+        (None, None, None)
+    """
+    if not arr:
+        return None
+    if all(type(item) is int for item in arr):
+        return "q" if -2 ** 63 <= min(arr) and max(arr) < 2 ** 63 else None
+    if all(type(item) is float for item in arr):
+        return "d"
+    return None
+
+
+def decorate(arr, key: Optional[Callable] = None, reverse: bool = False,
+             indexed: bool = False) -> Tuple[list, Optional[array]]:
+    """
+    Keys to sort and the index of their items. Without key the items are their own keys and the
+    index is None unless indexed is set.
+
+    Examples:
+        >>> decorate(['bb', 'a', 'ccc'], len)
+        (array('q', [2, 1, 3]), array('q', [0, 1, 2]))
+        >>> decorate(['bb', 'a', 'ccc'], str.upper, reverse=True)
+        (['CCC', 'A', 'BB'], array('q', [2, 1, 0]))
+        >>> decorate([3, 1, 2], reverse=True)
+        ([2, 1, 3], None)
+        >>> decorate([3, 1, 2], indexed=True)
+        (array('q', [3, 1, 2]), array('q', [0, 1, 2]))
+    """
+    # Срез NumPy-массива или memoryview — представление тех же данных, поэтому копия через list.
+    items = list(reversed(arr)) if reverse else list(arr)
+    if key is None and not indexed:
+        return items, None
+    keys = items if key is None else list(map(key, items))
+    code = typecode(keys)
+    index = array("q", range(len(keys) - 1, -1, -1) if reverse else range(len(keys)))
+    return (array(code, keys) if code else keys), index
+
+
+def gather(arr, keys, index: Optional[array], reverse: bool = False) -> list:
+    """
+    Sorted items from the sorted keys and index returned by decorate.
+
+    Examples:
+        >>> gather(['bb', 'a', 'ccc'], array('q', [1, 2, 3]), array('q', [1, 0, 2]))
+        ['a', 'bb', 'ccc']
+        >>> gather([3, 1, 2], [1, 2, 3], None, reverse=True)
+        [3, 2, 1]
+    """
+    result = keys if index is None else [arr[i] for i in index]
+    if reverse:
+        result.reverse()
+    return result
+
+
+def reorder(arr, index: array) -> None:
+    """
+    Put arr[index[k]] at position k of arr for every k, in place. The same index can reorder
+    several parallel columns one after another.
+
+    Examples:
+        >>> names, ages = ['bob', 'ann', 'cid'], array('q', [30, 25, 35])
+        >>> index = array('q', [1, 0, 2])
+        >>> reorder(names, index), reorder(ages, index)
+        (None, None)
+        >>> names, ages
+        (['ann', 'bob', 'cid'], array('q', [25, 30, 35]))
+    """
+    # Каждый цикл перестановки обходится один раз; пройденные номера помечаются как ~j < 0.
+    for start in range(len(index)):
+        if index[start] < 0:
+            continue
+        item, k = arr[start], start
+        while True:
+            j = index[k]
+            index[k] = ~j
+            if j == start:
+                arr[k] = item
+                break
+            arr[k] = arr[j]
+            k = j
+    for k in range(len(index)):
+        index[k] = ~index[k]
+
+
+def sort_inplace(arr, sort: Callable, key: Optional[Callable] = None, reverse: bool = False):
+    """
+    Sort the list, array, memoryview or NumPy array arr in place with sort(keys, index), which
+    sorts keys in place and moves index items alongside (index may be None). Return arr.
+
+    Examples:
+        >>> from merge_sort import _sort_keys
+        >>> arr = ['bb', 'a', 'ccc', 'dd', 'e']
+        >>> sort_inplace(arr, _sort_keys, len, reverse=True) is arr, arr
+        (True, ['ccc', 'bb', 'dd', 'a', 'e'])
+    """
+    if key is None:
+        # У memoryview и NumPy-массива нет reverse, а присваивание среза работает у всех.
+        if reverse:
+            arr[:] = arr[::-1]
+        sort(arr, None)
+        if reverse:
+            arr[:] = arr[::-1]
+        return arr
+    keys, index = decorate(arr, key, reverse)
+    sort(keys, index)
+    if reverse:
+        index.reverse()
+    reorder(arr, index)
+    return arr
+
+
+def argsort(arr, sort: Callable, key: Optional[Callable] = None, reverse: bool = False):
+    """
+    Positions of the items of arr in the order of a stable sort, without moving arr. sort is as
+    in sort_inplace. A NumPy array without key is passed to numpy.argsort.
+
+    Examples:
+        >>> from merge_sort import _sort_keys
+        >>> argsort([30, 10, 20, 10], _sort_keys)
+        array('q', [1, 3, 2, 0])
+        >>> argsort([30, 10, 20, 10], _sort_keys, reverse=True)
+        array('q', [0, 2, 1, 3])
+    """
+    if type(arr).__module__ == "numpy" and key is None:
+        import numpy
+        if not reverse:
+            return numpy.argsort(arr, kind="stable")
+        return (len(arr) - 1 - numpy.argsort(arr[::-1], kind="stable"))[::-1]
+    keys, index = decorate(arr, key, reverse, indexed=True)
+    sort(keys, index)
+    if reverse:
+        index.reverse()
+    return index
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
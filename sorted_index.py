@@ -0,0 +1,131 @@
+"""
+Static search index over a sorted array in the Eytzinger (BFS) layout. Built once in Θ(n),
+it answers the same queries as binary_search in Θ(log n) with far fewer cache misses at large n.
+Idea:
+    Отсортированный массив раскладывается в порядке обхода в ширину неявного двоичного дерева
+    поиска: корень — в ячейке 1, дети узла k — в ячейках 2k и 2k+1 (как в двоичной куче).
+    Заполнение делается симметричным обходом дерева, поэтому левое поддерево узла содержит
+    меньшие ключи, а правое — большие. Поиск спускается от корня: k = 2k + (tree[k] < item),
+    без ветвлений по результату сравнения. Первые уровни дерева лежат рядом в памяти и
+    остаются в кэше, а узлы одного пути расположены всё дальше друг от друга, но их
+    адреса предсказуемы. Когда спуск выходит за пределы массива, ответ — последний узел,
+    из которого спуск пошёл налево: он получается отбрасыванием единиц в конце двоичной
+    записи k и ещё одного бита. Для каждого узла хранится его номер в отсортированном массиве.
+"""
+from typing import List, Optional
+from array import array
+from bisect import bisect_left
+from time import perf_counter
+
+from binary_search import binary_search
+from sort_by_key import typecode
+
+
+class SortedIndex:
+    """
+    Examples:
+        >>> index = SortedIndex([1, 3, 3, 5, 8, 13])
+        >>> index.tree
+        array('q', [0, 5, 3, 13, 1, 3, 8])
+        >>> [index.bisect_left(item) for item in (0, 1, 3, 4, 13, 14)]
+        [0, 0, 1, 3, 5, 6]
+        >>> index.search(3), index.search(4), SortedIndex([]).search(1)
+        (1, None, None)
+        >>> SortedIndex(['ad', 'an', 'g']).search_many(['g', 'b', 'ad'])
+        [2, None, 0]
+        >>> import random
+        >>> arr = sorted(random.randint(0, 999) for _ in range(1000))
+        >>> queries = [random.randint(-10, 1010) for _ in range(500)]
+        >>> SortedIndex(arr).search_many(queries) == [binary_search(arr, query) for query in queries]
+        True
+    """
+
+    def __init__(self, sorted_arr) -> None:
+        size = len(sorted_arr)
+        self.size = size
+        self.numpy = type(sorted_arr).__module__ == "numpy"
+        if self.numpy:
+            import numpy
+            self.tree = numpy.zeros(size + 1, dtype=sorted_arr.dtype)
+            self.rank = numpy.zeros(size + 1, dtype=numpy.int64)
+        else:
+            code = typecode(sorted_arr)
+            if code:
+                self.tree = array(code, bytes(array(code).itemsize * (size + 1)))
+            else:
+                self.tree = [None] * (size + 1)
+            self.rank = array("q", bytes(8 * (size + 1)))
+        # Симметричный обход неявного дерева с явным стеком.
+        stack: List[int] = []
+        i, k = 0, 1
+        while stack or k <= size:
+            while k <= size:
+                stack.append(k)
+                k *= 2
+            k = stack.pop()
+            self.tree[k], self.rank[k] = sorted_arr[i], i
+            i += 1
+            k = 2 * k + 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _node(self, item) -> int:
+        """Node of the first key not less than item, or 0 if every key is less."""
+        tree, size, k = self.tree, self.size, 1
+        while k <= size:
+            k = 2 * k + (tree[k] < item)
+        k += 1
+        return k // ((k & -k) * 2)
+
+    def bisect_left(self, item) -> int:
+        """Index in the sorted array of the first key not less than item."""
+        k = self._node(item)
+        return int(self.rank[k]) if k else self.size
+
+    def search(self, item) -> Optional[int]:
+        """Index of the first key equal to item or None, as binary_search."""
+        k = self._node(item)
+        return int(self.rank[k]) if k and self.tree[k] == item else None
+
+    def search_many(self, queries) -> List[Optional[int]]:
+        """search for every query. An index over a NumPy array descends for all queries at once."""
+        if not self.numpy:
+            return [self.search(query) for query in queries]
+        import numpy
+        queries = numpy.asarray(queries)
+        tree, size = self.tree, self.size
+        k = numpy.ones(len(queries), dtype=numpy.int64)
+        for _ in range(size.bit_length()):
+            inside = k <= size
+            k = numpy.where(inside, 2 * k + (tree[numpy.minimum(k, size)] < queries), k)
+        k += 1
+        k //= (k & -k) * 2
+        found = (k > 0) & (tree[k] == queries)
+        return [int(rank) if hit else None for rank, hit in zip(self.rank[k].tolist(), found.tolist())]
+
+
+def benchmark(sizes=(10 ** 5, 10 ** 6, 10 ** 7), queries: int = 10 ** 5) -> None:
+    """
+    Print the time of queries lookups with SortedIndex, binary_search and bisect.bisect_left.
+    A size of 10 ** 8 works too but needs about 3 GB of memory.
+    """
+    import random
+    print(f"{'n':>10} {'SortedIndex':>12} {'binary_search':>14} {'bisect':>8}")
+    for size in sizes:
+        arr = array("q", range(0, 2 * size, 2))
+        items = [random.randrange(2 * size) for _ in range(queries)]
+        index = SortedIndex(arr)
+        timings = []
+        searches = (index.search, lambda item: binary_search(arr, item), lambda item: bisect_left(arr, item))
+        for search in searches:
+            start = perf_counter()
+            for item in items:
+                search(item)
+            timings.append(perf_counter() - start)
+        print(f"{size:>10} {timings[0]:12.3f} {timings[1]:14.3f} {timings[2]:8.3f}")
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
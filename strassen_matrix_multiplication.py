@@ -1,8 +1,25 @@
 """
 Strassen algorithm for matrix multiplication. Time complexity: Θ(n ** log 7).
-It supports only square matrices of length equal to degree 2.
+strassen_matrix_multiplication is the reference implementation on nested lists for square
+matrices of length equal to degree 2; other shapes are passed to block_strassen. block_strassen
+does the same on flat row-major buffers: quadrants are views (offset and row stride into the
+buffer) instead of copies, the seven products reuse scratch buffers allocated once per recursion
+level, and blocks with a side of cutoff or less are multiplied directly. It multiplies m×k by k×n
+matrices of any sizes: at each level an odd last row or column is peeled off and its
+contribution is added separately, so nothing is padded. parallel_strassen computes the products
+of the top one or two levels (7 or 49 tasks) in a process pool; the operands and the products
+are kept in shared memory, so only the task descriptions are pickled.
 """
-from typing import List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from operator import add, sub, mul
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product as cartesian
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+import os
+
+from sort_by_key import typecode
 
 
 Matrix = List[List[int]]
@@ -92,7 +109,14 @@ def strassen_matrix_multiplication(a: Matrix, b: Matrix) -> Matrix:
         ...     [[8, 1, 8, 6], [5, 6, 7, 1], [2, 5, 6, 1], [4, 8, 2, 6]]
         ... )  # doctest: +NORMALIZE_WHITESPACE
         [[78, 60, 82, 64], [79, 80, 69, 80], [121, 121, 131, 99], [78, 121, 90, 64]]
+        >>> strassen_matrix_multiplication([[1, 2, 3], [4, 5, 6]], [[7], [8], [9]])
+        [[50], [122]]
     """
+    size = len(a)
+    # Матрицы, не являющиеся квадратными матрицами одной длины, равной степени двойки.
+    if (size < 2 or size & (size - 1) or matrix_dimensions(a) != (size, size) or
+            len(b) != size or matrix_dimensions(b) != (size, size)):
+        return block_strassen(a, b)
     if matrix_dimensions(a) == (2, 2):
         return default_matrix_multiplication(a, b)
 
@@ -112,6 +136,384 @@ def strassen_matrix_multiplication(a: Matrix, b: Matrix) -> Matrix:
                          matrix_subtraction(matrix_subtraction(matrix_addition(t1, t5), t3), t7))
 
 
+class View(NamedTuple):
+    """A block of a flat row-major buffer: element (i, j) is data[offset + i*stride + j]."""
+    data: list
+    offset: int
+    stride: int
+
+    def row(self, i: int, n: int) -> list:
+        start = self.offset + i * self.stride
+        return self.data[start: start + n]
+
+    def column(self, j: int, m: int) -> list:
+        return self.data[self.offset + j: self.offset + j + m * self.stride: self.stride] if m else []
+
+    def quadrants(self, rows: int, cols: int) -> Tuple["View", "View", "View", "View"]:
+        data, offset, stride = self
+        return (View(data, offset, stride), View(data, offset + cols, stride),
+                View(data, offset + rows * stride, stride), View(data, offset + rows * stride + cols, stride))
+
+
+def _combine(out: View, a: View, b: View, m: int, n: int, op) -> None:
+    data, offset, stride = out
+    for i in range(m):
+        start = offset + i * stride
+        data[start: start + n] = map(op, a.row(i, n), b.row(i, n))
+
+
+def _copy(out: View, a: View, m: int, n: int) -> None:
+    data, offset, stride = out
+    for i in range(m):
+        start = offset + i * stride
+        data[start: start + n] = a.row(i, n)
+
+
+def _multiply(out: View, a: View, b: View, m: int, k: int, n: int, rows: range = None,
+              cols: range = None) -> None:
+    """out[i][j] = a[i] · b[:, j] for i in rows (all m by default) and j in cols (all n)."""
+    rows = range(m) if rows is None else rows
+    cols = range(n) if cols is None else cols
+    columns = [b.column(j, k) for j in cols]
+    data, offset, stride = out
+    for i in rows:
+        row = a.row(i, k)
+        start = offset + i * stride + cols.start
+        data[start: start + len(cols)] = [sum(map(mul, row, column)) for column in columns]
+
+
+def _levels(m: int, k: int, n: int, cutoff: int) -> List[Tuple[int, int, int]]:
+    """Sizes of the halves at every recursion level after peeling odd rows and columns."""
+    levels = []
+    while min(m, k, n) > cutoff:
+        m, k, n = m >> 1, k >> 1, n >> 1
+        levels.append((m, k, n))
+    return levels
+
+
+def _strassen(c: View, a: View, b: View, m: int, k: int, n: int,
+              scratch: List[Tuple[View, View, View]], cutoff: int, level: int = 0) -> None:
+    if min(m, k, n) <= cutoff:
+        _multiply(c, a, b, m, k, n)
+        return
+    # Динамическое отсечение: если размер нечётный, последняя строка или столбец не участвуют в
+    # рекурсии, а их вклад досчитывается отдельно, без дополнения матриц нулями.
+    hm, hk, hn = m >> 1, k >> 1, n >> 1
+    a11, a12, a21, a22 = a.quadrants(hm, hk)
+    b11, b12, b21, b22 = b.quadrants(hk, hn)
+    c11, c12, c21, c22 = c.quadrants(hm, hn)
+    s, t, p = scratch[level]
+
+    def product(x: View, y: View) -> None:
+        _strassen(p, x, y, hm, hk, hn, scratch, cutoff, level + 1)
+
+    # p1 = (a11 + a22)(b11 + b22)
+    _combine(s, a11, a22, hm, hk, add)
+    _combine(t, b11, b22, hk, hn, add)
+    product(s, t)
+    _copy(c11, p, hm, hn)
+    _copy(c22, p, hm, hn)
+    # p2 = (a21 + a22) b11
+    _combine(s, a21, a22, hm, hk, add)
+    product(s, b11)
+    _copy(c21, p, hm, hn)
+    _combine(c22, c22, p, hm, hn, sub)
+    # p3 = a11 (b12 - b22)
+    _combine(t, b12, b22, hk, hn, sub)
+    product(a11, t)
+    _copy(c12, p, hm, hn)
+    _combine(c22, c22, p, hm, hn, add)
+    # p4 = a22 (b21 - b11)
+    _combine(t, b21, b11, hk, hn, sub)
+    product(a22, t)
+    _combine(c11, c11, p, hm, hn, add)
+    _combine(c21, c21, p, hm, hn, add)
+    # p5 = (a11 + a12) b22
+    _combine(s, a11, a12, hm, hk, add)
+    product(s, b22)
+    _combine(c11, c11, p, hm, hn, sub)
+    _combine(c12, c12, p, hm, hn, add)
+    # p6 = (a21 - a11)(b11 + b12)
+    _combine(s, a21, a11, hm, hk, sub)
+    _combine(t, b11, b12, hk, hn, add)
+    product(s, t)
+    _combine(c22, c22, p, hm, hn, add)
+    # p7 = (a12 - a22)(b21 + b22)
+    _combine(s, a12, a22, hm, hk, sub)
+    _combine(t, b21, b22, hk, hn, add)
+    product(s, t)
+    _combine(c11, c11, p, hm, hn, add)
+
+    # Отсечённые части: вклад последнего столбца a и последней строки b, затем последние
+    # столбец и строка результата.
+    even_m, even_k, even_n = m & ~1, k & ~1, n & ~1
+    if k & 1:
+        column, row = a.column(k - 1, even_m), b.row(k - 1, even_n)
+        data, offset, stride = c
+        for i in range(even_m):
+            start = offset + i * stride
+            data[start: start + even_n] = map(add, data[start: start + even_n],
+                                              [column[i] * x for x in row])
+    if n & 1:
+        _multiply(c, a, b, m, k, n, cols=range(n - 1, n))
+    if m & 1:
+        _multiply(c, a, b, m, k, n, rows=range(m - 1, m), cols=range(even_n))
+
+
+def _shape(a: Matrix, b: Matrix) -> Tuple[int, int, int]:
+    """
+    Sizes m, k, n of the product of an m×k matrix a and a k×n matrix b.
+
+    Examples:
+        >>> _shape([[1, 2, 3]], [[4], [5], [6]]), _shape([], [])
+        ((1, 3, 1), (0, 0, 0))
+        >>> _shape([[1, 2], [3]], [[1], [1]])
+        Traceback (most recent call last):
+            ...
+        ValueError: cannot multiply 2x2 and 2x1 matrices
+    """
+    m, k = len(a), len(a[0]) if a else 0
+    n = len(b[0]) if b else 0
+    # Все строки должны быть одной длины, иначе лишние или недостающие числа молча теряются.
+    if len(b) != k or any(len(row) != k for row in a) or any(len(row) != n for row in b):
+        raise ValueError(f"cannot multiply {m}x{k} and {len(b)}x{n} matrices")
+    return m, k, n
+
+
+def block_strassen(a: Matrix, b: Matrix, cutoff: int = 64) -> Matrix:
+    """
+    Multiply an m×k matrix by a k×n matrix of any sizes.
+
+    Examples:
+        >>> block_strassen([[1, 2], [3, 4]], [[5, 6], [7, 8]], cutoff=1)
+        [[19, 22], [43, 50]]
+        >>> block_strassen(
+        ...     [[6, 2, 2, 4], [5, 1, 1, 8], [7, 5, 4, 8], [1, 6, 4, 8]],
+        ...     [[8, 1, 8, 6], [5, 6, 7, 1], [2, 5, 6, 1], [4, 8, 2, 6]], cutoff=1
+        ... )  # doctest: +NORMALIZE_WHITESPACE
+        [[78, 60, 82, 64], [79, 80, 69, 80], [121, 121, 131, 99], [78, 121, 90, 64]]
+        >>> block_strassen([[1, 2, 3]], [[4], [5], [6]], cutoff=1)
+        [[32]]
+        >>> block_strassen([[1, 2], [3, 4], [5, 6]], [[1, 0, 2], [0, 1, 3]], cutoff=1)
+        [[1, 2, 8], [3, 4, 18], [5, 6, 28]]
+        >>> block_strassen([], [])
+        []
+        >>> block_strassen([[1, 2]], [[1, 2]])
+        Traceback (most recent call last):
+            ...
+        ValueError: cannot multiply 1x2 and 1x2 matrices
+        >>> block_strassen([[1, 2], [3]], [[1], [1]])
+        Traceback (most recent call last):
+            ...
+        ValueError: cannot multiply 2x2 and 2x1 matrices
+        >>> import random
+        >>> a = [[random.randint(-9, 9) for _ in range(32)] for _ in range(32)]
+        >>> b = [[random.randint(-9, 9) for _ in range(32)] for _ in range(32)]
+        >>> block_strassen(a, b, cutoff=4) == strassen_matrix_multiplication(a, b)
+        True
+        >>> for m, k, n in [(37, 21, 50), (64, 33, 17), (9, 100, 15)]:
+        ...     a = [[random.randint(-9, 9) for _ in range(k)] for _ in range(m)]
+        ...     b = [[random.randint(-9, 9) for _ in range(n)] for _ in range(k)]
+        ...     expected = [[sum(x * y for x, y in zip(row, col)) for col in zip(*b)] for row in a]
+        ...     print(block_strassen(a, b, cutoff=2) == expected)
+        True
+        True
+        True
+    """
+    m, k, n = _shape(a, b)
+    scratch = [(View([0] * hm * hk, 0, hk), View([0] * hk * hn, 0, hn), View([0] * hm * hn, 0, hn))
+               for hm, hk, hn in _levels(m, k, n, cutoff)]
+
+    c = View([0] * m * n, 0, n)
+    _strassen(c, View([x for row in a for x in row], 0, k), View([x for row in b for x in row], 0, n),
+              m, k, n, scratch, cutoff)
+    return [c.row(i, n) for i in range(m)]
+
+
+# Коэффициенты семи произведений при квадрантах 11, 12, 21, 22 (номера 0, 1, 2, 3) множителей
+# и коэффициенты произведений p1..p7 в каждом квадранте результата (те же формулы, что в _strassen).
+A_TERMS = [{0: 1, 3: 1}, {2: 1, 3: 1}, {0: 1}, {3: 1}, {0: 1, 1: 1}, {2: 1, 0: -1}, {1: 1, 3: -1}]
+B_TERMS = [{0: 1, 3: 1}, {0: 1}, {1: 1, 3: -1}, {2: 1, 0: -1}, {3: 1}, {0: 1, 1: 1}, {2: 1, 3: 1}]
+C_TERMS = [{0: 1, 3: 1, 4: -1, 6: 1}, {2: 1, 4: 1}, {1: 1, 3: 1}, {0: 1, 1: -1, 2: 1, 5: 1}]
+
+
+def _expand(terms: List[Dict[int, int]], path: Tuple[int, ...], rows: int, cols: int,
+            stride: int) -> List[Tuple[int, int]]:
+    """
+    Linear combination of blocks (coefficient, offset) that forms the operand of the task path,
+    where rows and cols are the sides of the operand before the split.
+    """
+    combination = [(1, 0)]
+    for index in path:
+        rows, cols = rows >> 1, cols >> 1
+        combination = [(coef * weight, offset + quad // 2 * rows * stride + quad % 2 * cols)
+                       for coef, offset in combination for quad, weight in terms[index].items()]
+    return combination
+
+
+def _gather(buffer, combination: List[Tuple[int, int]], rows: int, cols: int, stride: int) -> list:
+    block = []
+    for i in range(rows):
+        row = [0] * cols
+        for coef, offset in combination:
+            start = offset + i * stride
+            part = buffer[start: start + cols].tolist()
+            row = list(map(add, row, part) if coef == 1 else map(sub, row, part))
+        block.extend(row)
+    return block
+
+
+def _product_task(names: Tuple[str, str, str], code: str, shape: Tuple[int, int, int],
+                  path: Tuple[int, ...], slot: int, cutoff: int) -> None:
+    m, k, n = shape
+    depth = len(path)
+    bm, bk, bn = m >> depth, k >> depth, n >> depth
+    memories = [SharedMemory(name) for name in names]
+    views = []
+    try:
+        views = [memory.buf.cast(code) for memory in memories]
+        a, b, out = views
+        s = _gather(a, _expand(A_TERMS, path, m, k, k), bm, bk, k)
+        t = _gather(b, _expand(B_TERMS, path, k, n, n), bk, bn, n)
+        p = View([0] * bm * bn, 0, bn)
+        scratch = [(View([0] * hm * hk, 0, hk), View([0] * hk * hn, 0, hn), View([0] * hm * hn, 0, hn))
+                   for hm, hk, hn in _levels(bm, bk, bn, cutoff)]
+        _strassen(p, View(s, 0, bk), View(t, 0, bn), bm, bk, bn, scratch, cutoff)
+        out[slot * bm * bn: (slot + 1) * bm * bn] = array(code, p.data)
+    finally:
+        # Представления освобождаются до close, иначе ошибка задачи сменится на BufferError.
+        for view in views:
+            view.release()
+        for memory in memories:
+            memory.close()
+
+
+def parallel_strassen(a: Matrix, b: Matrix, workers: Optional[int] = None, depth: Optional[int] = None,
+                      cutoff: int = 64) -> Matrix:
+    """
+    Multiply an m×k matrix by a k×n matrix of numbers, computing the 7 ** depth products of the top
+    depth levels of the recursion in a pool of worker processes. By default depth is the smallest
+    of 1 and 2 that gives at least two tasks per worker. Rows and columns beyond a multiple of
+    2 ** depth are added by direct products. Integer matrices whose products could overflow
+    64 bits and matrices not only of ints or only of floats are multiplied by block_strassen in
+    the current process.
+
+    Examples:
+        >>> import random
+        >>> a = [[random.randint(-9, 9) for _ in range(37)] for _ in range(30)]
+        >>> b = [[random.randint(-9, 9) for _ in range(23)] for _ in range(37)]
+        >>> parallel_strassen(a, b, workers=2, cutoff=2) == block_strassen(a, b)
+        True
+        >>> parallel_strassen(a, b, workers=2, depth=2, cutoff=2) == block_strassen(a, b)
+        True
+        >>> a = [[random.random() for _ in range(16)] for _ in range(16)]
+        >>> all(abs(x - y) < 1e-9 for r1, r2 in zip(parallel_strassen(a, a, workers=2), block_strassen(a, a))
+        ...     for x, y in zip(r1, r2))
+        True
+        >>> parallel_strassen([[2 ** 40]], [[2 ** 40]])
+        [[1208925819614629174706176]]
+        >>> a = [[10 ** 9] * 4 for _ in range(4)]
+        >>> parallel_strassen(a, a, workers=2, depth=2, cutoff=1) == block_strassen(a, a)
+        True
+        >>> from fractions import Fraction
+        >>> parallel_strassen([[Fraction(2, 3)]], [[Fraction(2, 3)]], workers=2)
+        [[Fraction(4, 9)]]
+        >>> parallel_strassen([[1, 2], [3, 4]], [[1, 2], [3]])
+        Traceback (most recent call last):
+            ...
+        ValueError: cannot multiply 2x2 and 2x2 matrices
+    """
+    m, k, n = _shape(a, b)
+    workers = workers or os.cpu_count() or 1
+    if depth is None:
+        depth = 1 if 7 >= 2 * workers else 2
+    unit = 1 << depth
+    em, ek, en = m // unit * unit, k // unit * unit, n // unit * unit
+
+    flat_a = [x for row in a for x in row]
+    flat_b = [x for row in b for x in row]
+    # Только матрицы из одних int или одних float помещаются в буферы без потери точности.
+    code = typecode(flat_a + flat_b)
+    fits = code is not None
+    if code == "q":
+        # Каждый операнд задачи — сумма до 2 ** depth блоков a или b, поэтому элементы
+        # произведения задачи могут быть в 4 ** depth раз больше произведения a на b.
+        bound = max(map(abs, flat_a), default=0) * max(map(abs, flat_b), default=0) * k
+        fits = bound << 2 * depth < 1 << 63
+    if not fits or not em or not ek or not en:
+        return block_strassen(a, b, cutoff)
+
+    # Общие буферы: ядро a (em×ek), ядро b (ek×en) и все произведения задач подряд.
+    tasks = list(cartesian(range(7), repeat=depth))
+    block = (em >> depth) * (en >> depth)
+    core_a = array(code, [x for row in a[:em] for x in row[:ek]])
+    core_b = array(code, [x for row in b[:ek] for x in row[:en]])
+    memories = [SharedMemory(create=True, size=max(1, size * core_a.itemsize))
+                for size in (em * ek, ek * en, len(tasks) * block)]
+    views = []
+    try:
+        views = [memory.buf.cast(code) for memory in memories]
+        views[0][:] = core_a
+        views[1][:] = core_b
+        names = tuple(memory.name for memory in memories)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_product_task, names, code, (em, ek, en), path, slot, cutoff)
+                       for slot, path in enumerate(tasks)]
+            for future in futures:
+                future.result()
+        products = views[2].tolist()
+    finally:
+        for view in views:
+            view.release()
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+    # Сборка ядра результата: квадрант на пути path равен сумме произведений задач с
+    # коэффициентами, перемноженными по уровням.
+    c = View([0] * m * n, 0, n)
+    bm, bn = em >> depth, en >> depth
+    for path in cartesian(range(4), repeat=depth):
+        offset = 0
+        for level, quad in enumerate(path, 1):
+            offset += quad // 2 * (em >> level) * n + quad % 2 * (en >> level)
+        target = View(c.data, offset, n)
+        for slot, task in enumerate(tasks):
+            coef = 1
+            for quad, index in zip(path, task):
+                coef *= C_TERMS[quad].get(index, 0)
+            if coef:
+                p = View(products, slot * block, bn)
+                _combine(target, target, p, bm, bn, add if coef > 0 else sub)
+
+    # Отсечённые части, как в _strassen: вклад лишних столбцов a, затем лишние столбцы и строки c.
+    va, vb = View(flat_a, 0, k), View(flat_b, 0, n)
+    for extra in range(ek, k):
+        column, row = va.column(extra, em), vb.row(extra, en)
+        for i in range(em):
+            start = i * n
+            c.data[start: start + en] = map(add, c.data[start: start + en], [column[i] * x for x in row])
+    _multiply(c, va, vb, m, k, n, cols=range(en, n))
+    _multiply(c, va, vb, m, k, n, rows=range(em, m), cols=range(en))
+    return [c.row(i, n) for i in range(m)]
+
+
+def benchmark(size: int = 512, max_workers: Optional[int] = None, cutoff: int = 64) -> None:
+    """Print the time and the speedup of parallel_strassen on size×size matrices for 1..N workers."""
+    import random
+    a = [[random.random() for _ in range(size)] for _ in range(size)]
+    b = [[random.random() for _ in range(size)] for _ in range(size)]
+    start = perf_counter()
+    block_strassen(a, b, cutoff)
+    base = perf_counter() - start
+    print(f"{'sequential':>12}: {base:8.2f} s")
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        start = perf_counter()
+        parallel_strassen(a, b, workers, cutoff=cutoff)
+        elapsed = perf_counter() - start
+        print(f"{workers:>4} workers: {elapsed:8.2f} s  x{base / elapsed:.2f}")
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -3,9 +3,16 @@ Algorithm for solving Sudoku puzzles of any difficulty. It takes a sudoku grid a
 a 9x9 array with the proper answer for the puzzle. Or it returns None in cases of:
     1. Invalid grid (not 9x9; values not in the range 1~9; digits in rows, columns or squares are repeated);
     2. Multiple solutions for the same puzzle or the puzzle is unsolvable.
+For bulk workloads solve_many solves puzzles in the 81-character line format (digits row by row,
+0 or . for an empty cell) across a process pool; read_puzzles and write_solutions stream that
+format from and to text files.
 """
-from typing import List, Optional
-from collections import defaultdict
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from time import perf_counter
+import os
 
 
 Matrix = List[List[int]]
@@ -59,38 +66,139 @@ def check(puzzle: Matrix) -> bool:
     return True
 
 
+# Клетки пронумерованы от 0 до 80. Для каждой клетки храним индексы её строки, столбца и квадрата.
+CELLS = [(r, c, r // 3 * 3 + c // 3) for r in range(9) for c in range(9)]
+UNITS = ([[9*r + c for c in range(9)] for r in range(9)] +
+         [[9*r + c for r in range(9)] for c in range(9)] +
+         [[9*(3*br + r) + 3*bc + c for r in range(3) for c in range(3)]
+          for br in range(3) for bc in range(3)])
+# Цифра dig кодируется битом 1 << dig, поэтому множество всех цифр — биты с 1 по 9.
+FULL = 0b1111111110
+DIGIT = {1 << dig: dig for dig in range(1, 10)}
+POPCOUNT = [bin(mask).count("1") for mask in range(FULL + 1)]
+
+
+def _place(grid: List[int], rows: List[int], cols: List[int], boxes: List[int],
+           trail: List[int], cell: int, bit: int) -> None:
+    r, c, b = CELLS[cell]
+    grid[cell] = bit
+    rows[r] |= bit
+    cols[c] |= bit
+    boxes[b] |= bit
+    trail.append(cell)
+
+
+def _undo(grid: List[int], rows: List[int], cols: List[int], boxes: List[int],
+          trail: List[int], mark: int) -> None:
+    while len(trail) > mark:
+        cell = trail.pop()
+        r, c, b = CELLS[cell]
+        bit = grid[cell]
+        grid[cell] = 0
+        rows[r] ^= bit
+        cols[c] ^= bit
+        boxes[b] ^= bit
+
+
+def _propagate(grid: List[int], rows: List[int], cols: List[int], boxes: List[int],
+               trail: List[int]) -> Optional[Tuple[int, int]]:
+    """
+    Idea:
+        Расставляем «голые» одиночки (у клетки остался один кандидат) и «скрытые» одиночки
+        (цифра может стоять только в одной клетке строки, столбца или квадрата), пока это
+        возможно. Возвращает None при противоречии, (-1, 0) если сетка заполнена, иначе клетку
+        с наименьшим числом кандидатов и маску её кандидатов.
+    """
+    while True:
+        progress = False
+        best_cell, best_count, best_mask = -1, 10, 0
+        for cell in range(81):
+            if grid[cell]:
+                continue
+            r, c, b = CELLS[cell]
+            mask = FULL & ~(rows[r] | cols[c] | boxes[b])
+            if not mask:
+                return
+            if not mask & (mask - 1):
+                _place(grid, rows, cols, boxes, trail, cell, mask)
+                progress = True
+            elif POPCOUNT[mask] < best_count:
+                best_cell, best_count, best_mask = cell, POPCOUNT[mask], mask
+        if progress:
+            continue
+
+        for unit in UNITS:
+            once = twice = placed = 0
+            for cell in unit:
+                if grid[cell]:
+                    placed |= grid[cell]
+                    continue
+                r, c, b = CELLS[cell]
+                mask = FULL & ~(rows[r] | cols[c] | boxes[b])
+                twice |= once & mask
+                once |= mask
+            # Какую-то цифру некуда поставить.
+            if once | placed != FULL:
+                return
+            hidden = once & ~twice
+            if not hidden:
+                continue
+            for cell in unit:
+                if grid[cell]:
+                    continue
+                r, c, b = CELLS[cell]
+                bit = FULL & ~(rows[r] | cols[c] | boxes[b]) & hidden
+                if bit:
+                    # Две цифры могут стоять только в одной и той же клетке.
+                    if bit & (bit - 1):
+                        return
+                    _place(grid, rows, cols, boxes, trail, cell, bit)
+                    progress = True
+        if not progress:
+            return best_cell, best_mask
+
+
+def _search(grid: List[int], rows: List[int], cols: List[int], boxes: List[int],
+            trail: List[int], solutions: List[List[int]], limit: int) -> None:
+    mark = len(trail)
+    branch = _propagate(grid, rows, cols, boxes, trail)
+    if branch is not None:
+        cell, mask = branch
+        if cell == -1:
+            solutions.append(grid.copy())
+        while mask and len(solutions) < limit:
+            bit = mask & -mask
+            mask ^= bit
+            inner = len(trail)
+            _place(grid, rows, cols, boxes, trail, cell, bit)
+            _search(grid, rows, cols, boxes, trail, solutions, limit)
+            _undo(grid, rows, cols, boxes, trail, inner)
+    _undo(grid, rows, cols, boxes, trail, mark)
+
+
 def solve(puzzle: Matrix) -> Optional[Matrix]:
-    min_allow = 10
-    for row, col in [(r, c) for r in range(9) for c in range(9) if not puzzle[r][c]]:
-        rr, cc = row // 3 * 3, col // 3 * 3
-        use = {1, 2, 3, 4, 5, 6, 7, 8, 9} - (
-              {puzzle[r][col] for r in range(9)} | {puzzle[row][c] for c in range(9)} |
-              {puzzle[rr + r][cc + c] for r in range(3) for c in range(3)})
-
-        allow = len(use)
-        if not allow:
-            return
-        if allow == 1:
-            dig = use.pop()
-            puzzle[row][col] = dig
-            return solve(puzzle)
-        if min_allow > allow:
-            min_allow, min_use, min_row, min_col = allow, use, row, col
-
-    if min_allow == 2:
-        success = None
-        for dig in min_use:
-            replica = [row.copy() for row in puzzle]
-            replica[min_row][min_col] = dig
-            attempt = solve(replica)
-            if attempt:
-                if success:
-                    return
-                success = attempt
-        return success
-    if min_allow != 10:
+    """
+    Idea:
+        Для каждой строки, столбца и квадрата храним битовую маску уже поставленных цифр, так что
+        кандидаты клетки вычисляются парой побитовых операций. Все расстановки записываются в
+        журнал (trail), а при возврате из ветви перебора откатываются по нему, без копирования
+        сетки. После распространения одиночек ветвимся по клетке с наименьшим числом кандидатов
+        (MRV) и прекращаем поиск, как только найдено второе решение.
+    """
+    grid = [0] * 81
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    trail = []
+    for cell, dig in enumerate(dig for row in puzzle for dig in row):
+        if dig:
+            _place(grid, rows, cols, boxes, trail, cell, 1 << dig)
+    trail.clear()
+
+    solutions = []
+    _search(grid, rows, cols, boxes, trail, solutions, 2)
+    if len(solutions) != 1:
         return
-    return puzzle
+    grid = solutions[0]
+    return [[DIGIT[grid[9*r + c]] for c in range(9)] for r in range(9)]
 
 
 def sudoku_puzzle(puzzle: Matrix) -> Optional[Matrix]:
@@ -175,12 +283,163 @@ def sudoku_puzzle(puzzle: Matrix) -> Optional[Matrix]:
          [6, 3, 7, 5, 2, 8, 1, 9, 4],
          [5, 8, 1, 9, 4, 3, 6, 7, 2], 
          [2, 4, 9, 1, 7, 6, 3, 5, 8]]
+
+        >>> sudoku_puzzle([[8, 0, 0, 0, 0, 0, 0, 0, 0],
+        ...                [0, 0, 3, 6, 0, 0, 0, 0, 0],
+        ...                [0, 7, 0, 0, 9, 0, 2, 0, 0],
+        ...                [0, 5, 0, 0, 0, 7, 0, 0, 0],
+        ...                [0, 0, 0, 0, 4, 5, 7, 0, 0],
+        ...                [0, 0, 0, 1, 0, 0, 0, 3, 0],
+        ...                [0, 0, 1, 0, 0, 0, 0, 6, 8],
+        ...                [0, 0, 8, 5, 0, 0, 0, 1, 0],
+        ...                [0, 9, 0, 0, 0, 0, 4, 0, 0]])  # doctest: +NORMALIZE_WHITESPACE
+        [[8, 1, 2, 7, 5, 3, 6, 4, 9],
+         [9, 4, 3, 6, 8, 2, 1, 7, 5],
+         [6, 7, 5, 4, 9, 1, 2, 8, 3],
+         [1, 5, 4, 2, 3, 7, 8, 9, 6],
+         [3, 6, 9, 8, 4, 5, 7, 2, 1],
+         [2, 8, 7, 1, 6, 9, 5, 3, 4],
+         [5, 2, 1, 9, 7, 4, 3, 6, 8],
+         [4, 3, 8, 5, 2, 6, 9, 1, 7],
+         [7, 9, 6, 3, 1, 8, 4, 5, 2]]
+
+        >>> sudoku_puzzle([[8, 0, 0, 0, 0, 0, 0, 0, 0],
+        ...                [0, 0, 3, 6, 0, 0, 0, 0, 0],
+        ...                [0, 7, 0, 0, 9, 0, 2, 0, 0],
+        ...                [0, 5, 0, 0, 0, 7, 0, 0, 0],
+        ...                [0, 0, 0, 0, 4, 5, 7, 0, 0],
+        ...                [0, 0, 0, 1, 0, 0, 0, 3, 0],
+        ...                [0, 0, 1, 0, 0, 0, 0, 6, 8],
+        ...                [0, 6, 8, 0, 0, 0, 0, 9, 0],
+        ...                [0, 0, 0, 0, 0, 0, 4, 0, 0]])
+        
     """
     if not check(puzzle):
         return
     return solve(puzzle)
 
 
+def parse_line(line: str) -> Matrix:
+    """
+    Examples:
+        >>> parse_line("12.4" + 77 * "0")[0]
+        [1, 2, 0, 4, 0, 0, 0, 0, 0]
+        >>> check(parse_line("1x" + 79 * "0")), check(parse_line("1²" + 79 * "0"))
+        (False, False)
+    """
+    # Посторонние символы оставляем как есть, чтобы такую сетку отклонила check.
+    # isdigit верен и для символов вроде '²', которые int не принимает.
+    cells = [int(ch) if ch in "0123456789" else 0 if ch == "." else ch for ch in line]
+    return [cells[i: i + 9] for i in range(0, len(cells), 9)]
+
+
+def format_line(grid: Optional[Matrix]) -> str:
+    """
+    Examples:
+        >>> format_line(None)
+        ''
+        >>> format_line([[1, 2, 3]] * 3)
+        '123123123'
+    """
+    if grid is None:
+        return ""
+    return "".join(str(dig) for row in grid for dig in row)
+
+
+def read_puzzles(file: TextIO) -> Iterator[str]:
+    """Yield the non-empty lines of a file in the 81-character line format."""
+    for line in file:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def write_solutions(file: TextIO, solutions: Iterable[Optional[str]]) -> int:
+    """Write one solution per line (an empty line for None) and return the number of lines."""
+    count = 0
+    for solution in solutions:
+        file.write((solution or "") + "\n")
+        count += 1
+    return count
+
+
+def _solve_chunk(lines: List[str]) -> Tuple[List[Optional[str]], float]:
+    # Разбор строк и форматирование ответов выполняются в рабочем процессе, так что между
+    # процессами передаются только короткие строки, по целому блоку за раз.
+    start = perf_counter()
+    results = []
+    for line in lines:
+        solution = sudoku_puzzle(parse_line(line))
+        results.append(None if solution is None else format_line(solution))
+    return results, perf_counter() - start
+
+
+def solve_many(puzzles: Iterable[str], workers: Optional[int] = None, chunksize: int = 512,
+               report: Optional[Callable[[int, int, float], None]] = None) -> Iterator[Optional[str]]:
+    """
+    Solve puzzles given in the 81-character line format and yield their solutions in the same
+    format (None for an invalid, unsolvable or ambiguous puzzle) in input order. Puzzles are sent
+    to a pool of worker processes in chunks of chunksize lines; workers=1 solves them in the
+    current process. After every chunk report(index, size, seconds) is called, if given, with the
+    time spent solving that chunk.
+
+    Examples:
+        >>> import io
+        >>> file = io.StringIO(
+        ...     "006100008080090030200005400400001800030070040007900003008400006020050080100002500\\n"
+        ...     "\\n"
+        ...     "000000000000000000000000000000000000000000000000000000000000000000000000000000000\\n"
+        ...     "3.5.9....1.....54...46........2..9...6.489.1...2..5........81...81.....2....7.3.8\\n")
+        >>> for solution in solve_many(read_puzzles(file), workers=2, chunksize=2):
+        ...     print(solution)
+        346127958785694132219385467462531879931278645857946213598413726624759381173862594
+        None
+        325794861176832549894651723458217936763489215912365487637528194581943672249176358
+        >>> list(solve_many([], workers=1))
+        []
+        >>> puzzle = "006100008080090030200005400400001800030070040007900003008400006020050080100002500"
+        >>> [solution is None for solution in solve_many(["1²" + 79 * "0", puzzle], workers=1)]
+        [True, False]
+        >>> solve_many([], chunksize=0)
+        Traceback (most recent call last):
+            ...
+        ValueError: chunksize must be positive
+    """
+    # Проверка выполняется сразу при вызове, а не при первом обращении к генератору.
+    if chunksize <= 0:
+        raise ValueError("chunksize must be positive")
+    return _solve_many(iter(puzzles), workers, chunksize, report)
+
+
+def _solve_many(puzzles: Iterator[str], workers: Optional[int], chunksize: int,
+                report: Optional[Callable[[int, int, float], None]]) -> Iterator[Optional[str]]:
+    chunks = iter(lambda: list(islice(puzzles, chunksize)), [])
+    index = 0
+
+    def collect(results: List[Optional[str]], elapsed: float) -> List[Optional[str]]:
+        nonlocal index
+        if report is not None:
+            report(index, len(results), elapsed)
+        index += 1
+        return results
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from collect(*_solve_chunk(chunk))
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        # Ограничиваем число блоков в работе, чтобы не читать весь вход в память заранее.
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_solve_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from collect(*pending.popleft().result())
+        while pending:
+            yield from collect(*pending.popleft().result())
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()